@@ -1,16 +1,107 @@
-from jose import jwt
+from jose import jwt, JWTError
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
+import time
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.concurrency import run_in_threadpool
 
-load_dotenv()
+import config  # noqa: F401  (.env)
+import database
+import models
+from cache import TTLCache
 
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+# Profile changes show up after at most this long
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# ==============================================
+# 🔑 Verification (local, HS256)
+# ==============================================
+# token -> claims, each entry living until the token's own exp
+_claims = TTLCache(TOKEN_CACHE_SIZE, ttl=0)
+# email -> {"id", "name", "email", "google_id"}
+_users = TTLCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str):
+    return HTTPException(
+        status_code=401,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_token(token: str) -> dict:
+    """Verified claims of an access token; raises 401 if invalid or expired"""
+    claims = _claims.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _unauthorized("Invalid or expired token")
+
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        _claims.set(token, claims, ttl=remaining)
+    return claims
+
+
+def _load_user(db, email: str):
+    user = db.query(models.Users).filter(models.Users.email == email).first()
+    if user is None:
+        return None
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "google_id": user.google_id,
+    }
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> dict:
+    """FastAPI dependency: the user behind ``Authorization: Bearer <token>``.
+
+    Claims and user rows are cached, so a warm request makes no DB call.
+    """
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+
+    email = decode_token(credentials.credentials).get("sub")
+    if not email:
+        raise _unauthorized("Invalid or expired token")
+
+    user = _users.get(email)
+    if user is None:
+        user = await run_in_threadpool(database.run_with_session, _load_user, email)
+        if user is None:
+            raise _unauthorized("User not found")
+        _users.set(email, user)
+    return user
+
+
+def forget_user(email: str):
+    """Drop a cached user row (call after changing or deleting the user)"""
+    _users.pop(email)
+
+
+def cache_stats() -> dict:
+    return {"tokens": _claims.stats(), "users": _users.stats()}
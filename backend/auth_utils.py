@@ -1,14 +1,114 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pin the cost with BCRYPT_ROUNDS; otherwise it is picked at startup so one
+# hash takes about BCRYPT_TARGET_MS on this machine
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+BCRYPT_TARGET_MS = int(os.getenv("BCRYPT_TARGET_MS", "250"))
+# Calibration only ever raises the cost above passlib's default of 12
+BCRYPT_MIN_ROUNDS = 12
+BCRYPT_MAX_ROUNDS = 15
+# Cost of the timing probe (cheap; each round doubles the time)
+_PROBE_ROUNDS = 10
 
-def hash_password(password: str) -> str:
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Hashes queued or running; past this, logins/registrations get a 503
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+
+
+def _make_context(rounds: int) -> CryptContext:
+    # min_rounds makes verify_and_update flag hashes made with a lower cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+pwd_context = _make_context(int(BCRYPT_ROUNDS or 12))
+
+
+def _truncate(password: str) -> str:
     # bcrypt can only handle up to 72 characters
-    if len(password) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    return password[:72]
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(_truncate(password))
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    if len(plain_password) > 72:
-        plain_password = plain_password[:72]
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.verify(_truncate(plain_password), hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """``(valid, new hash or None)``; a new hash is returned when the stored
+    one uses an older (lower) cost than the current one."""
+    return pwd_context.verify_and_update(_truncate(plain_password), hashed_password)
+
+
+# ==============================================
+# 🧵 Dedicated hashing pool (never the shared threadpool)
+# ==============================================
+class HashingBusy(Exception):
+    pass
+
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+
+
+async def run_hashing(fn, *args):
+    """Run bcrypt work on its own pool; raise HashingBusy instead of queueing
+    past HASH_MAX_PENDING, so a login burst can't pile up."""
+    global _pending
+    if _pending >= HASH_MAX_PENDING:
+        raise HashingBusy("Too many password checks in progress")
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+def hashing_stats() -> dict:
+    return {
+        "rounds": pwd_context.handler("bcrypt").default_rounds,
+        "workers": HASH_WORKERS,
+        "pending": _pending,
+        "max_pending": HASH_MAX_PENDING,
+    }
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
+
+
+# ==============================================
+# ⏱️ Startup cost calibration
+# ==============================================
+def _pick_rounds(target_ms: int = BCRYPT_TARGET_MS) -> int:
+    """Highest cost whose hash time stays under target_ms (each round doubles it)"""
+    probe = _make_context(_PROBE_ROUNDS)
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        probe.hash("calibration")
+        timings.append((time.perf_counter() - start) * 1000)
+    extra = math.floor(math.log2(max(target_ms / min(timings), 1)))
+    return max(BCRYPT_MIN_ROUNDS, min(_PROBE_ROUNDS + extra, BCRYPT_MAX_ROUNDS))
+
+
+async def calibrate() -> int:
+    global pwd_context
+    if BCRYPT_ROUNDS:
+        return int(BCRYPT_ROUNDS)
+    rounds = await run_hashing(_pick_rounds)
+    pwd_context = _make_context(rounds)
+    return rounds
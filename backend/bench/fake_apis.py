@@ -0,0 +1,167 @@
+"""Local stand-ins for HuggingFace, DeepL and Spoonacular.
+
+    python -m bench.fake_apis --port 9100 --latency hf=300,spoonacular=150 --errors spoonacular=0.02
+
+Latency is per request (ms, +/- --jitter percent); errors are answered with a
+503. Answers are deterministic per input, so app-side caches behave as they
+would against the real APIs.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+APIS = ("hf", "deepl", "spoonacular")
+
+DEFAULT_LATENCY_MS = {"hf": 300, "deepl": 80, "spoonacular": 150}
+
+# What the fake classifier "sees"; also used to seed favorites in bench.seed
+FOODS = [
+    "ramen", "sushi", "pizza", "hamburger", "fried_rice", "gyoza", "takoyaki",
+    "pad_thai", "bibimbap", "tacos", "caesar_salad", "pancakes", "tiramisu",
+    "curry", "okonomiyaki", "pho", "lasagna", "falafel", "miso_soup", "donuts",
+]
+# complexSearch finds nothing for these
+UNKNOWN_FOODS = {"okonomiyaki", "miso_soup"}
+
+
+def _stable_int(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+def parse_rates(spec: str, default: dict | None = None) -> dict:
+    """``"hf=300,deepl=80"`` -> ``{"hf": 300.0, "deepl": 80.0, ...}``"""
+    rates = dict(default or {api: 0 for api in APIS})
+    for part in filter(None, (spec or "").split(",")):
+        api, value = part.split("=")
+        if api not in APIS:
+            raise ValueError(f"unknown API {api!r} (expected one of {', '.join(APIS)})")
+        rates[api] = float(value)
+    return rates
+
+
+def create_app(latency_ms: dict, error_rates: dict, jitter: float = 0.2,
+               spoonacular_points: float = 1_000_000) -> FastAPI:
+    app = FastAPI(title="Fake external APIs")
+    stats = {api: {"requests": 0, "errors": 0} for api in APIS}
+
+    async def simulate(api: str):
+        """Sleep like the real API; returns an error response or None"""
+        stats[api]["requests"] += 1
+        base = latency_ms.get(api, 0)
+        await asyncio.sleep(max(0.0, random.uniform(base * (1 - jitter), base * (1 + jitter))) / 1000)
+        if random.random() < error_rates.get(api, 0):
+            stats[api]["errors"] += 1
+            return JSONResponse({"error": "simulated failure"}, status_code=503)
+        return None
+
+    # ---------------- HuggingFace inference ----------------
+    @app.post("/hf-inference/models/{model:path}")
+    async def classify(model: str, request: Request):
+        body = await request.body()
+        if (error := await simulate("hf")) is not None:
+            return error
+        top = _stable_int(hashlib.sha256(body).hexdigest()) % len(FOODS)
+        return [
+            {"label": FOODS[(top + i) % len(FOODS)], "score": round(0.9 / (i + 1), 4)}
+            for i in range(5)
+        ]
+
+    # ---------------- DeepL ----------------
+    @app.post("/v2/translate")
+    async def translate(request: Request):
+        form = await request.form()
+        texts = form.getlist("text")
+        if (error := await simulate("deepl")) is not None:
+            return error
+        return {
+            "translations": [
+                {"detected_source_language": "EN", "text": f"[{form.get('target_lang', 'JA')}] {t}"}
+                for t in texts
+            ]
+        }
+
+    # ---------------- Spoonacular ----------------
+    quota = {"used": 0.0}
+
+    def spend(response: Response, points: float):
+        """Quota headers like the real API; 402 once the points are used up"""
+        if quota["used"] + points > spoonacular_points:
+            return JSONResponse({"status": "failure", "code": 402}, status_code=402)
+        quota["used"] += points
+        response.headers["X-API-Quota-Request"] = str(points)
+        response.headers["X-API-Quota-Used"] = str(quota["used"])
+        response.headers["X-API-Quota-Left"] = str(max(0.0, spoonacular_points - quota["used"]))
+
+    @app.get("/recipes/complexSearch")
+    async def complex_search(response: Response, query: str = "", number: int = 1):
+        if (error := await simulate("spoonacular")) is not None:
+            return error
+        if (error := spend(response, 1 + 0.01 * number)) is not None:
+            return error
+        name = query.replace(" recipe", "").replace("how to make ", "").replace(" ", "_")
+        if name in UNKNOWN_FOODS or name not in FOODS:
+            return {"results": [], "totalResults": 0}
+        recipe_id = 1000 + FOODS.index(name)
+        return {
+            "results": [
+                {"id": recipe_id, "title": name.replace("_", " ").title(),
+                 "image": f"https://img.spoonacular.test/{recipe_id}.jpg"}
+            ][:number],
+            "totalResults": 1,
+        }
+
+    @app.get("/recipes/{recipe_id}/information")
+    async def recipe_information(recipe_id: int, response: Response):
+        if (error := await simulate("spoonacular")) is not None:
+            return error
+        if (error := spend(response, 1)) is not None:
+            return error
+        title = FOODS[(recipe_id - 1000) % len(FOODS)].replace("_", " ").title()
+        return {
+            "id": recipe_id,
+            "title": title,
+            "image": f"https://img.spoonacular.test/{recipe_id}.jpg",
+            "instructions": f"Prepare the {title}. Cook it. Serve warm.",
+            "extendedIngredients": [
+                {"name": f"ingredient {recipe_id}-{i}", "amount": i + 1, "unit": "g"}
+                for i in range(8)
+            ],
+            "sourceUrl": f"https://recipes.test/{recipe_id}",
+        }
+
+    # ---------------- Plumbing ----------------
+    @app.get("/")
+    async def root():
+        return {"fake": True}
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {**stats, "spoonacular_points_used": quota["used"]}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake HuggingFace/DeepL/Spoonacular server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="", help="per-API latency in ms, e.g. hf=300,deepl=80")
+    parser.add_argument("--errors", default="", help="per-API error rate 0..1, e.g. spoonacular=0.02")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction")
+    parser.add_argument("--spoonacular-points", type=float, default=1_000_000,
+                        help="Spoonacular points before answering 402")
+    args = parser.parse_args()
+
+    app = create_app(
+        parse_rates(args.latency, DEFAULT_LATENCY_MS),
+        parse_rates(args.errors),
+        args.jitter,
+        args.spoonacular_points,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,93 @@
+"""Synthetic data for benchmarks: users with favorites, posts, likes, comments.
+
+    python -m bench.seed --database-url sqlite:///bench.db --users 1000 --posts 5000
+
+Drops and recreates every table at the given URL — point it at a scratch
+database only.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select, update
+
+import models
+from bench.fake_apis import FOODS
+
+BATCH = 5000
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH):
+        conn.execute(insert(table), rows[start:start + BATCH])
+
+
+def seed(database_url: str, users: int = 1000, posts: int = 5000, likes_per_post: int = 10,
+         comments_per_post: int = 3, seed_value: int = 42) -> dict:
+    rng = random.Random(seed_value)
+    engine = create_engine(database_url)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        _insert(conn, models.Users.__table__, [
+            {"id": i, "name": f"user{i}", "email": f"user{i}@bench.test", "password_hash": None}
+            for i in range(1, users + 1)
+        ])
+
+        favorites = []
+        for user_id in range(1, users + 1):
+            for position, food in enumerate(rng.sample(FOODS, rng.randint(2, 5))):
+                favorites.append({"user_id": user_id, "food_name": food.replace("_", " "),
+                                  "position": position})
+        _insert(conn, models.UserFavoriteFood.__table__, favorites)
+
+        _insert(conn, models.CommunityPost.__table__, [
+            {
+                "id": i,
+                "user_id": rng.randint(1, users),
+                "dish_name": rng.choice(FOODS).replace("_", " "),
+                "dish_image": f"/uploads/bench-{i}.jpg",
+                "opinion": "Synthetic post",
+                "created_at": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+            }
+            for i in range(1, posts + 1)
+        ])
+
+        likes, comments = [], []
+        for post_id in range(1, posts + 1):
+            for user_id in rng.sample(range(1, users + 1), min(users, rng.randint(0, 2 * likes_per_post))):
+                likes.append({"post_id": post_id, "user_id": user_id})
+            for _ in range(rng.randint(0, 2 * comments_per_post)):
+                comments.append({
+                    "post_id": post_id,
+                    "user_id": rng.randint(1, users),
+                    "comment": "Looks delicious!",
+                    "created_at": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+                })
+        _insert(conn, models.PostLike.__table__, likes)
+        _insert(conn, models.PostComment.__table__, comments)
+
+        # denormalized counters, as manage.py reconcile-counts would
+        post = models.CommunityPost
+        conn.execute(update(post).values(
+            likes_count=select(func.count(models.PostLike.id))
+            .where(models.PostLike.post_id == post.id).scalar_subquery(),
+            comments_count=select(func.count(models.PostComment.id))
+            .where(models.PostComment.post_id == post.id).scalar_subquery(),
+        ))
+
+    engine.dispose()
+    return {"users": users, "posts": posts, "likes": len(likes), "comments": len(comments)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a scratch database with synthetic data")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--likes-per-post", type=int, default=10)
+    parser.add_argument("--comments-per-post", type=int, default=3)
+    args = parser.parse_args()
+    print(seed(args.database_url, args.users, args.posts, args.likes_per_post, args.comments_per_post))
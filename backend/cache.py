@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ==============================================
+# 🧊 In-process caches
+# ==============================================
+_MISSING = object()
+
+
+class LRUCache:
+    """Size-bounded LRU map with hit/miss counters.
+
+    Safe to share between the event loop and threadpool workers.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def items(self) -> list:
+        """Snapshot of the entries, least recently used first (no stats/LRU update)"""
+        with self._lock:
+            return list(self._data.items())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache:
+    """Size-bounded cache whose entries go stale after ``ttl`` seconds.
+
+    Stale entries are still returned (flagged as stale) for another
+    ``stale_ttl`` seconds so callers can serve them while refreshing.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Return ``(value, is_stale)``, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, fresh_until, expires_at = entry
+            if now >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if now >= fresh_until:
+                self.stale_hits += 1
+                return value, True
+            self.hits += 1
+            return value, False
+
+    def get(self, key, default=None):
+        hit = self.lookup(key)
+        if hit is None or hit[1]:
+            return default
+        return hit[0]
+
+    def set(self, key, value, ttl: float | None = None, stale_ttl: float | None = None):
+        now = time.monotonic()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        expires_at = fresh_until + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            self._data[key] = (value, fresh_until, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
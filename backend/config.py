@@ -0,0 +1,8 @@
+"""Loads backend/.env once. Import this before any module that reads
+os.getenv at import time (main does it first)."""
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ENV_PATH = Path(__file__).resolve().parent / ".env"
+load_dotenv(dotenv_path=ENV_PATH)
@@ -1,33 +1,225 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 import os
-from pathlib import Path
 
-# ✅ Force .env load from the backend folder (same as database.py)
-env_path = Path(__file__).resolve().parent / ".env"
-print(f"🔍 Loading .env from: {env_path}")
-load_dotenv(dotenv_path=env_path)
+import config  # noqa: F401  (.env)
+import metrics
 
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_DB = os.getenv("MYSQL_DB")
 
-# Debug check
-print(f"✅ DB Config Loaded:")
-print(f"  USER={MYSQL_USER}")
-print(f"  HOST={MYSQL_HOST}")
-print(f"  DB={MYSQL_DB}")
+# DATABASE_URL / ASYNC_DATABASE_URL override the MySQL settings (e.g. SQLite for bench/)
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
+)
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
+)
+
+# Async routers use aiomysql when DB_ASYNC=1, otherwise the sync pool via threads
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+# Pool settings (per engine, per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+# MySQL drops idle connections after wait_timeout; recycle well before that
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": True,
+}
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# ==============================================
+# 🔌 Engine (created on first use, not at import)
+# ==============================================
+_engine = None
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        connect_args = {}
+        if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+            # sessions move between threadpool threads; wait on writer locks
+            connect_args = {"check_same_thread": False, "timeout": 30}
+        _engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **POOL_OPTIONS)
+        metrics.instrument_engine(_engine)
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def SessionLocal():
+    get_engine()
+    return _session_factory()
+
+
+def __getattr__(name):
+    # ``database.engine`` keeps working for scripts
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def run_with_session(fn, *args):
+    """Call ``fn(db, *args)`` with a fresh session (for run_in_threadpool)"""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+# ==============================================
+# ⚡ Async sessions
+# ==============================================
+_async_engine = None
+AsyncSessionLocal = None
+
+
+def get_async_engine():
+    global _async_engine, AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+        metrics.instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+class ThreadedSession:
+    """The subset of AsyncSession the routers use, backed by a sync Session
+    whose I/O runs in the threadpool. Used when DB_ASYNC is off."""
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """AsyncSession (aiomysql) when DB_ASYNC=1, else a ThreadedSession.
+
+    Both expose ``run_sync(fn, *args)``, so the sync query helpers in
+    services/ are shared by either mode.
+    """
+    if DB_ASYNC:
+        get_async_engine()
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = ThreadedSession(SessionLocal())
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+# ==============================================
+# 🔥 Warmup (open pooled connections before traffic)
+# ==============================================
+DB_WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", str(min(DB_POOL_SIZE, 4))))
+
+
+def _open_connections(n: int) -> int:
+    engine = get_engine()
+    conns = []
+    try:
+        for _ in range(n):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        # closing returns them to the pool, still connected
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+async def warm_up(connections: int = DB_WARM_CONNECTIONS) -> int:
+    opened = await run_in_threadpool(_open_connections, connections)
+    if DB_ASYNC:
+        engine = get_async_engine()
+        conns = [await engine.connect() for _ in range(connections)]
+        for conn in conns:
+            await conn.execute(text("SELECT 1"))
+            await conn.close()
+    return opened
+
+
+# ==============================================
+# 📊 Pool usage
+# ==============================================
+def _pool_stats(pool) -> dict:
+    if not hasattr(pool, "checkedout"):
+        # e.g. SQLite's StaticPool/NullPool
+        return {"status": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+
+
+def pool_stats() -> dict:
+    stats = {}
+    if _engine is not None:
+        stats["sync"] = _pool_stats(_engine.pool)
+    if _async_engine is not None:
+        stats["async"] = _pool_stats(_async_engine.sync_engine.pool)
+    return stats
+
+
+async def dispose_engines():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
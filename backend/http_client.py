@@ -0,0 +1,79 @@
+import asyncio
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+# ==============================================
+# 🌐 Shared async HTTP client
+# ==============================================
+# One pooled client per worker process. Connections to HuggingFace, DeepL and
+# Spoonacular are kept alive and reused instead of opening a new TCP/TLS
+# session on every call.
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "10"))
+
+_client: httpx.AsyncClient | None = None
+_host_limits: dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _host_limits.clear()
+
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    # httpx only limits the pool as a whole, so cap each upstream separately
+    # to stop one slow API from taking every connection.
+    host = urlsplit(url).netloc
+    sem = _host_limits.get(host)
+    if sem is None:
+        sem = _host_limits[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return sem
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    async with _host_limit(url):
+        return await get_client().request(method, url, **kwargs)
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+async def warm_up(urls: list[str], per_host: int = 2) -> int:
+    """Open keep-alive connections to each upstream origin ahead of traffic.
+
+    Sends HEAD / (no API quota); the status doesn't matter. Returns how many
+    requests got an answer.
+    """
+    origins = {f"{p.scheme}://{p.netloc}/" for p in map(urlsplit, urls)}
+    results = await asyncio.gather(
+        *(request("HEAD", origin, timeout=5) for origin in origins for _ in range(per_host)),
+        return_exceptions=True,
+    )
+    return sum(1 for r in results if not isinstance(r, Exception))
@@ -1,62 +1,124 @@
 # ==============================================
-# ✅ Load environment variables FIRST
+# ✅ Imports (config loads .env before anything reads it)
 # ==============================================
-from pathlib import Path
-from dotenv import load_dotenv
-import os
-
-env_path = Path(__file__).resolve().parent / ".env"
-print(f"🔍 Loading .env from: {env_path}")
-load_dotenv(dotenv_path=env_path)
+import config  # noqa: F401
 
-print("DEBUG — testing .env load:")
-print("MYSQL_USER =", os.getenv("MYSQL_USER"))
-print("MYSQL_PASSWORD =", os.getenv("MYSQL_PASSWORD"))
-print("MYSQL_DB =", os.getenv("MYSQL_DB"))
-print("MYSQL_HOST =", os.getenv("MYSQL_HOST"))
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 
-# ==============================================
-# ✅ Imports
-# ==============================================
-from fastapi import FastAPI, File, UploadFile, Body
+from fastapi import FastAPI, File, UploadFile, Body, BackgroundTasks, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-import models
 import database
+import http_client
+import auth_jwt
+import auth_utils
+import metrics
 from routers import auth, auth_google, posts, community
+from middleware import MaxBodySizeMiddleware, ServerTimingMiddleware
+from services import (
+    classifier, food_image_service, google_auth_service, image_utils, prediction_cache,
+    preferences_service, recipe_service, spoonacular_service, translation_service,
+    upload_storage, write_buffer,
+)
 
-import requests
-from PIL import Image
-from io import BytesIO
+# Warmup never holds startup longer than this; the app serves either way
+STARTUP_WARMUP_TIMEOUT = float(os.getenv("STARTUP_WARMUP_TIMEOUT", "10"))
 
 
 # ==============================================
-# 🌐 DeepL Translation
+# 🔥 Startup / shutdown (lifespan)
 # ==============================================
-DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
+# No I/O happens at import time. Tables are managed with
+# ``python manage.py sync-schema``, not by the API process.
+startup_timings: dict = {}
 
-def translate_to_japanese(text: str) -> str:
+
+async def _timed(name: str, coro):
+    start = time.perf_counter()
     try:
-        if not text:
-            return ""
-        url = "https://api-free.deepl.com/v2/translate"
-        params = {
-            "auth_key": DEEPL_API_KEY,
-            "text": text,
-            "target_lang": "JA"
-        }
-        response = requests.post(url, data=params)
-        data = response.json()
-        return data["translations"][0]["text"]
+        return await coro
+    finally:
+        startup_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _upstream_urls() -> list[str]:
+    urls = [spoonacular_service.BASE_URL, translation_service.DEEPL_URL]
+    if classifier.CLASSIFIER_BACKEND == "remote":
+        urls.append(classifier.HUGGINGFACE_BASE_URL)
+    if google_auth_service.GOOGLE_CLIENT_IDS:
+        urls.append(google_auth_service.GOOGLE_JWKS_URL)
+    return urls
+
+
+async def _warm_up():
+    steps = {
+        "db_connections": database.warm_up(),
+        "http_connections": http_client.warm_up(_upstream_urls()),
+        "translations": run_in_threadpool(translation_service.warm_cache),
+    }
+    if google_auth_service.GOOGLE_CLIENT_IDS:
+        steps["google_jwks"] = google_auth_service.refresh_jwks()
+
+    results = await asyncio.gather(
+        *(_timed(name, step) for name, step in steps.items()),
+        return_exceptions=True,
+    )
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            print(f"❌ Warmup {name} failed:", result)
+        elif result is not None:
+            print(f"🔥 Warmup {name}: {result}")
+
+
+async def startup():
+    start = time.perf_counter()
+    upload_storage.ensure_upload_dir()
+
+    async def warm_up():
+        try:
+            await asyncio.wait_for(_warm_up(), STARTUP_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"❌ Warmup still running after {STARTUP_WARMUP_TIMEOUT}s, serving anyway")
+
+    _, rounds, _ = await asyncio.gather(
+        _timed("classifier", classifier.get_classifier().start()),
+        _timed("bcrypt_calibration", auth_utils.calibrate()),
+        warm_up(),
+    )
+    startup_timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"🚀 Ready in {startup_timings['total']} ms (bcrypt cost {rounds})")
+
+
+async def shutdown():
+    await write_buffer.drain()
+    try:
+        await translation_service.flush()
     except Exception as e:
-        print("❌ Translation error:", e)
-        return text
+        print("❌ Translation hit flush failed:", e)
+    await classifier.get_classifier().close()
+    image_utils.shutdown()
+    auth_utils.shutdown()
+    await http_client.close_client()
+    await database.dispose_engines()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
 
 
 # ==============================================
 # 🚀 FastAPI Setup
 # ==============================================
-app = FastAPI(title="🍣 Food AI Backend")
+app = FastAPI(title="🍣 Food AI Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -66,13 +128,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# API Keys
-HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
-HUGGINGFACE_MODEL = os.getenv("HUGGINGFACE_MODEL")
-SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
+# Oversized uploads are refused while still streaming (+64 KiB multipart overhead)
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    max_bytes=image_utils.MAX_UPLOAD_BYTES + 64 * 1024,
+    paths=["/predict", "/posts/add"],
+)
 
-# Load DB tables
-models.Base.metadata.create_all(bind=database.engine)
+# Outermost: per-stage Server-Timing header + request latency histogram
+app.add_middleware(ServerTimingMiddleware)
 
 # Include routers
 app.include_router(posts.router)
@@ -82,134 +146,56 @@ app.include_router(community.router)
 
 
 # ==============================================
-# ⭐ NEW — Get food image from Spoonacular
+# 🧠 Predict endpoint
 # ==============================================
-def get_food_image(food_name: str):
-    try:
-        search_url = (
-            f"https://api.spoonacular.com/recipes/complexSearch"
-            f"?query={food_name}&number=1&apiKey={SPOONACULAR_API_KEY}"
-        )
-        res = requests.get(search_url, timeout=10).json()
-
-        if res.get("results"):
-            return res["results"][0].get("image")
-
-    except Exception as e:
-        print("❌ Image fetch error:", e)
-
-    return None  # fallback
+def _prepare_image(image_bytes: bytes, with_phash: bool):
+    """512px JPEG for the model (+ perceptual hash). Runs on the image pool."""
+    image = image_utils.load_thumbnail(image_bytes, (512, 512))
+    phash = prediction_cache.perceptual_hash(image) if with_phash else None
+    return image_utils.encode_jpeg(image, quality=85), phash
 
 
-# ==============================================
-# 🧠 Predict endpoint
-# ==============================================
 @app.post("/predict")
 async def predict_food(file: UploadFile = File(...)):
     try:
-        # Resize image
-        image_bytes = await file.read()
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-        image.thumbnail((512, 512))
-        buf = BytesIO()
-        image.save(buf, format="JPEG", quality=85)
-        img_final = buf.getvalue()
-
-        # HuggingFace Prediction
-        hf_url = f"https://router.huggingface.co/hf-inference/models/{HUGGINGFACE_MODEL}"
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-            "Content-Type": "image/jpeg",
-        }
-
-        print("🚀 Sending image to HuggingFace...")
-        res = requests.post(hf_url, headers=headers, data=img_final, timeout=60)
-
+        # Resize image (streamed read, decode/resize on the image pool)
         try:
-            pred = res.json()
-        except:
-            return {"error": "Invalid HuggingFace response", "recipe_found": False}
-
-        if not pred or not isinstance(pred, list):
-            return {"error": "No prediction", "recipe_found": False}
-
-        food_name = pred[0]["label"].lower()
-        confidence = pred[0]["score"]
-
-        # Translate to Japanese
-        food_name_jp = translate_to_japanese(food_name)
-
-        # Try multiple queries to Spoonacular
-        search_queries = [
-            food_name,
-            food_name.replace("_", " "),
-            f"{food_name} recipe",
-            f"how to make {food_name}",
-        ]
-
-        recipe_id = None
-        for q in search_queries:
-            search_url = (
-                f"https://api.spoonacular.com/recipes/complexSearch"
-                f"?query={q}&number=1&apiKey={SPOONACULAR_API_KEY}"
-            )
-            res2 = requests.get(search_url, timeout=15)
-            search_data = res2.json()
-            if search_data.get("results"):
-                recipe_id = search_data["results"][0]["id"]
-                break
-
-        if not recipe_id:
-            return {
-                "predicted_food_en": food_name,
-                "predicted_food_jp": food_name_jp,
-                "confidence": confidence,
-                "recipe_found": False,
-                "recipe": None,
-            }
-
-        # Fetch full recipe info
-        info_url = (
-            f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-            f"?apiKey={SPOONACULAR_API_KEY}"
-        )
-        info_res = requests.get(info_url, timeout=20)
-        info = info_res.json()
-
-        title_en = info.get("title", "")
-        instructions_en = info.get("instructions", "No instructions available.")
-        ingredients_raw = info.get("extendedIngredients", [])
-
-        # Translate
-        title_jp = translate_to_japanese(title_en)
-        instructions_jp = translate_to_japanese(instructions_en)
-        ingredients_jp = [
-            translate_to_japanese(ing.get("name", "")) 
-            for ing in ingredients_raw
-        ]
-
-        recipe = {
-            "name_en": title_en,
-            "name_jp": title_jp,
-            "image": info.get("image"),
-            "instructions_en": instructions_en,
-            "instructions_jp": instructions_jp,
-            "ingredients_en": [
-                {
-                    "ingredient": ing.get("name"),
-                    "measure": f"{ing.get('amount', '')} {ing.get('unit', '')}".strip()
-                }
-                for ing in ingredients_raw
-            ],
-            "ingredients_jp": ingredients_jp,
-            "sourceUrl": info.get("sourceUrl"),
-        }
+            image_bytes = await image_utils.read_image_upload(file)
+            with metrics.stage("decode"):
+                img_final, phash = await image_utils.run_in_pool(
+                    _prepare_image, image_bytes, prediction_cache.PREDICTION_PHASH
+                )
+        except image_utils.ImageRejected as e:
+            return {"error": str(e), "recipe_found": False}
+
+        # Same photo again? Reuse the earlier prediction
+        digest = prediction_cache.image_digest(img_final)
+        cached = prediction_cache.lookup(digest, phash)
+
+        if cached is not None:
+            food_name, confidence = cached
+        else:
+            # Classifier (HuggingFace or local model, see CLASSIFIER_BACKEND)
+            try:
+                with metrics.stage("inference"):
+                    pred = await classifier.get_classifier().classify(img_final)
+            except classifier.ClassifierError as e:
+                return {"error": str(e), "recipe_found": False}
+
+            food_name = pred[0]["label"].lower()
+            confidence = pred[0]["score"]
+            prediction_cache.store(digest, (food_name, confidence), phash)
+
+        # Recipe + Japanese label (cached per food name; just the label
+        # when the Spoonacular budget is used up)
+        recipe, food_name_jp, looked_up = await recipe_service.get_recipe_or_name(food_name)
 
         return {
             "predicted_food_en": food_name,
             "predicted_food_jp": food_name_jp,
             "confidence": confidence,
-            "recipe_found": True,
+            "recipe_found": recipe is not None,
+            "recipe_unavailable": not looked_up,
             "recipe": recipe,
         }
 
@@ -222,66 +208,15 @@ async def predict_food(file: UploadFile = File(...)):
 # ⭐ NEW: Fetch Recipe by Name (Fix for Home → Recipe)
 # ============================================================
 @app.get("/recipe/{food_name}")
-def get_recipe_by_name(food_name: str):
+async def get_recipe_by_name(food_name: str):
     try:
-        search_queries = [
-            food_name,
-            food_name.replace("_", " "),
-            f"{food_name} recipe",
-            f"how to make {food_name}",
-        ]
-
-        recipe_id = None
-
-        # Search Spoonacular
-        for q in search_queries:
-            search_url = (
-                f"https://api.spoonacular.com/recipes/complexSearch"
-                f"?query={q}&number=1&apiKey={SPOONACULAR_API_KEY}"
-            )
-            search_data = requests.get(search_url).json()
-
-            if search_data.get("results"):
-                recipe_id = search_data["results"][0]["id"]
-                break
-
-        if not recipe_id:
-            return {"detail": "Not Found", "recipe": None}
+        # Search Spoonacular (cached per food name)
+        recipe, _, looked_up = await recipe_service.get_recipe_or_name(food_name)
 
-        # Fetch complete recipe
-        info_url = (
-            f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-            f"?apiKey={SPOONACULAR_API_KEY}"
-        )
-        info = requests.get(info_url).json()
-
-        title_en = info.get("title", "")
-        instructions_en = info.get("instructions", "")
-        ingredients_raw = info.get("extendedIngredients", [])
-
-        # Translate
-        title_jp = translate_to_japanese(title_en)
-        instructions_jp = translate_to_japanese(instructions_en)
-        ingredients_jp = [
-            translate_to_japanese(ing.get("name", "")) for ing in ingredients_raw
-        ]
-
-        recipe = {
-            "name_en": title_en,
-            "name_jp": title_jp,
-            "image": info.get("image"),
-            "instructions_en": instructions_en,
-            "instructions_jp": instructions_jp,
-            "ingredients_en": [
-                {
-                    "ingredient": ing.get("name"),
-                    "measure": f"{ing.get('amount', '')} {ing.get('unit', '')}".strip(),
-                }
-                for ing in ingredients_raw
-            ],
-            "ingredients_jp": ingredients_jp,
-            "sourceUrl": info.get("sourceUrl"),
-        }
+        if not looked_up:
+            return {"detail": "Recipe temporarily unavailable", "recipe": None}
+        if not recipe:
+            return {"detail": "Not Found", "recipe": None}
 
         return {"recipe": recipe}
 
@@ -294,22 +229,17 @@ def get_recipe_by_name(food_name: str):
 # ⭐ Save user preferences
 # ============================================================
 @app.post("/users/{user_id}/preferences")
-def save_preferences(user_id: int, prefs: dict = Body(...)):
-    foods = prefs.get("foods", [])
-    foods_str = ",".join(foods)
-
+def save_preferences(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    prefs: dict = Body(...),
+    db: Session = Depends(database.get_db)
+):
     try:
-        conn = database.engine.raw_connection()
-        cur = conn.cursor()
-
-        cur.execute(
-            "UPDATE users SET favorite_foods=%s WHERE id=%s",
-            (foods_str, user_id)
-        )
-        conn.commit()
+        foods = preferences_service.save_favorites(db, user_id, prefs.get("foods", []))
 
-        cur.close()
-        conn.close()
+        # Resolve images now so the home screen doesn't wait on Spoonacular
+        background_tasks.add_task(food_image_service.prewarm, foods)
         return {"status": "ok", "saved": foods}
 
     except Exception as e:
@@ -319,36 +249,136 @@ def save_preferences(user_id: int, prefs: dict = Body(...)):
 # ============================================================
 # ⭐ UPDATED — Get Recommendations with Images
 # ============================================================
-@app.get("/recommendations/name/{username}")
-def get_recommendations_by_name(username: str):
-    try:
-        conn = database.engine.raw_connection()
-        cur = conn.cursor()
+async def _recommendations(foods: list[str]):
+    # No preferences
+    if not foods:
+        return {"items": []}
 
-        cur.execute("SELECT favorite_foods FROM users WHERE name=%s", (username,))
-        row = cur.fetchone()
+    # ⭐ Return food name + image (stored; unknown ones resolved concurrently)
+    images = await food_image_service.get_images(foods)
+    return {"items": [{"name": f, "image": images[f]} for f in foods]}
 
-        cur.close()
-        conn.close()
 
-        # No preferences
-        if not row or not row[0]:
-            return {"items": []}
+@app.get("/recommendations/name/{username}")
+async def get_recommendations_by_name(username: str):
+    try:
+        # DB driver is blocking — keep it off the event loop
+        foods = await run_in_threadpool(
+            database.run_with_session, preferences_service.favorites_by_username, username
+        )
+        return await _recommendations(foods)
 
-        foods = row[0].split(",")
+    except Exception as e:
+        return {"error": str(e)}
 
-        # ⭐ Return food name + image
-        results = [
-            {"name": f, "image": get_food_image(f)}
-            for f in foods
-        ]
 
-        return {"items": results}
+@app.get("/recommendations/{user_id}")
+async def get_recommendations(user_id: int):
+    try:
+        foods = await run_in_threadpool(
+            database.run_with_session, preferences_service.favorites_by_user_id, user_id
+        )
+        return await _recommendations(foods)
 
     except Exception as e:
         return {"error": str(e)}
 
 
+# ============================================================
+# 🔥 Food popularity
+# ============================================================
+@app.get("/foods/popular")
+def get_popular_foods(limit: int = Query(10, ge=1, le=100), db: Session = Depends(database.get_db)):
+    return {"items": preferences_service.popular_foods(db, limit)}
+
+
+@app.get("/foods/{food_name}/fans")
+def get_food_fans(food_name: str, limit: int = Query(50, ge=1, le=200), db: Session = Depends(database.get_db)):
+    return {"items": preferences_service.users_who_like(db, food_name, limit)}
+
+
+# ==============================================
+# 📊 Cache stats
+# ==============================================
+@app.get("/stats")
+def cache_stats():
+    return {
+        "prediction_cache": prediction_cache.cache_stats(),
+        "recipe_cache": recipe_service.cache_stats(),
+        "translation_cache": translation_service.cache_stats(),
+        "db_pool": database.pool_stats(),
+        "write_buffer": write_buffer.stats(),
+        "password_hashing": auth_utils.hashing_stats(),
+        "auth_cache": auth_jwt.cache_stats(),
+        "google_auth": google_auth_service.cache_stats(),
+        "spoonacular": spoonacular_service.limiter_stats(),
+        "startup_ms": startup_timings,
+    }
+
+
+# ==============================================
+# 📈 Prometheus metrics
+# ==============================================
+def _collect_metrics():
+    translation = translation_service.cache_stats()
+    auth_cache = auth_jwt.cache_stats()
+    families = metrics.cache_families({
+        "prediction": prediction_cache.cache_stats(),
+        "recipe": recipe_service.cache_stats(),
+        "translation": translation,
+        "translation_db": {
+            "hits": translation["db_hits"],
+            "misses": translation["db_misses"],
+            "hit_rate": translation["db_hits"] / max(1, translation["db_hits"] + translation["db_misses"]),
+        },
+        "auth_tokens": auth_cache["tokens"],
+        "auth_users": auth_cache["users"],
+        "google_profiles": google_auth_service.cache_stats()["profiles"],
+    })
+
+    pool_samples = [
+        ({"engine": engine, "state": state}, stats[state])
+        for engine, stats in database.pool_stats().items()
+        for state in ("checked_out", "checked_in")
+        if state in stats
+    ]
+    if pool_samples:
+        families.append(("db_pool_connections", "gauge", "DB pool connections", pool_samples))
+
+    buffered = write_buffer.stats()
+    families += [
+        ("write_buffer_pending", "gauge", "Likes/comments waiting to be written",
+         [({}, buffered["pending"])]),
+        ("write_buffer_rows_total", "counter", "Rows written by the write-behind buffer",
+         [({"kind": "likes"}, buffered["likes"]), ({"kind": "comments"}, buffered["comments"])]),
+        ("write_buffer_errors_total", "counter", "Failed write-behind flushes",
+         [({}, buffered["errors"])]),
+        ("password_hashing_pending", "gauge", "bcrypt jobs queued or running",
+         [({}, auth_utils.hashing_stats()["pending"])]),
+    ]
+
+    spoonacular = spoonacular_service.limiter_stats()
+    families += [
+        ("spoonacular_coalesced_total", "counter", "Spoonacular calls that joined an identical in-flight call",
+         [({}, spoonacular["coalesced"])]),
+        ("spoonacular_throttled_total", "counter", "Spoonacular calls refused locally",
+         [({"reason": "points"}, spoonacular["throttled_points"]),
+          ({"reason": "rate"}, spoonacular["throttled_rate"])]),
+    ]
+    if spoonacular["points_left"] is not None:
+        families.append(("spoonacular_points_budget", "gauge", "Points the local budget allows right now",
+                         [({}, spoonacular["points_left"])]))
+    return families
+
+
+metrics.register_collector(_collect_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ==============================================
 # 🏠 Home Route
 # ==============================================
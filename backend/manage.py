@@ -0,0 +1,207 @@
+"""Maintenance commands, run outside the API process.
+
+    python manage.py sync-schema
+    python manage.py reconcile-counts
+    python manage.py dedupe-likes      (sync-schema runs it before adding uq_post_likes_post_user)
+    python manage.py migrate-favorites (sync-schema runs it while users.favorite_foods exists)
+    python manage.py check-startup     (fails if import/startup is over budget)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+import database
+import models
+from services import feed_service, preferences_service
+
+
+# ==============================================
+# 🗄️ Schema
+# ==============================================
+# Denormalized columns that start at their DEFAULT when added to existing rows
+COUNTER_COLUMNS = {("community_posts", "likes_count"), ("community_posts", "comments_count")}
+
+
+def sync_schema():
+    """Create missing tables, then add columns/indexes that create_all
+    skips on tables that already exist. Counters added to existing posts are
+    recomputed, so feeds don't show 0 likes/comments, and legacy favorites
+    are copied into user_favorite_foods."""
+    engine = database.get_engine()
+    models.Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    added = set()
+    recount = False
+
+    # Old data may hold duplicate likes, which the unique index would reject
+    if "uq_post_likes_post_user" not in {i["name"] for i in inspector.get_indexes("post_likes")}:
+        db = database.SessionLocal()
+        try:
+            removed = feed_service.dedupe_likes(db)
+        finally:
+            db.close()
+        if removed:
+            print(f"🧹 Removed {removed} duplicate likes")
+            recount = True
+
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    print(f"➕ {table.name}.{column.name}")
+                    added.add((table.name, column.name))
+
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    print(f"➕ {index.name}")
+
+    if recount or added & COUNTER_COLUMNS:
+        reconcile_counts()
+
+    if "favorite_foods" in {c["name"] for c in inspect(engine).get_columns("users")}:
+        migrate_favorites()
+
+
+# ==============================================
+# 🔢 Counters
+# ==============================================
+def reconcile_counts():
+    db = database.SessionLocal()
+    try:
+        total = feed_service.reconcile_counts(db)
+    finally:
+        db.close()
+    print(f"✅ Recomputed like/comment counts for {total} posts")
+
+
+def dedupe_likes():
+    db = database.SessionLocal()
+    try:
+        removed = feed_service.dedupe_likes(db)
+    finally:
+        db.close()
+    print(f"✅ Removed {removed} duplicate likes (run reconcile-counts next)")
+
+
+# ==============================================
+# ⭐ Favorites
+# ==============================================
+def migrate_favorites():
+    """Copy the legacy comma-joined users.favorite_foods column into
+    user_favorite_foods, for users that have no rows there yet.
+
+    The legacy value is blanked once copied (user_favorite_foods is the
+    source of truth from then on), so a later run can't bring back
+    favorites the user has since removed.
+    """
+    columns = {c["name"] for c in inspect(database.get_engine()).get_columns("users")}
+    if "favorite_foods" not in columns:
+        print("Nothing to migrate (users.favorite_foods does not exist)")
+        return
+
+    db = database.SessionLocal()
+    try:
+        migrated = {
+            user_id for (user_id,) in db.query(models.UserFavoriteFood.user_id).distinct()
+        }
+        rows = db.execute(text(
+            "SELECT id, favorite_foods FROM users "
+            "WHERE favorite_foods IS NOT NULL AND favorite_foods <> ''"
+        )).all()
+        count = 0
+        for user_id, foods_csv in rows:
+            if user_id not in migrated:
+                preferences_service.save_favorites(db, user_id, foods_csv.split(","))
+                count += 1
+            db.execute(text("UPDATE users SET favorite_foods = '' WHERE id = :id"), {"id": user_id})
+            db.commit()
+    finally:
+        db.close()
+    print(f"✅ Migrated favorites for {count} users")
+
+
+# ==============================================
+# ⏱️ Startup budget
+# ==============================================
+# Importing main must stay I/O-free; startup includes warmup (bounded by
+# STARTUP_WARMUP_TIMEOUT) and bcrypt calibration
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1500"))
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", "12000"))
+
+_MEASURE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = (time.perf_counter() - start) * 1000
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        return dict(main.startup_timings)
+
+timings = asyncio.run(run())
+print(json.dumps({"import_ms": round(imported, 1), "startup": timings}))
+"""
+
+
+def measure_startup(env: dict | None = None) -> dict:
+    """Cold import of main and a full lifespan startup in a fresh
+    interpreter: ``{"import_ms": ..., "startup": {step: ms, "total": ms}}``"""
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stdout + result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_startup():
+    """Exit non-zero when import or startup is over budget"""
+    try:
+        measured = measure_startup()
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+    import_ms = measured["import_ms"]
+    startup_ms = measured["startup"]["total"]
+    print(f"import  {import_ms:8.1f} ms  (budget {IMPORT_BUDGET_MS})")
+    print(f"startup {startup_ms:8.1f} ms  (budget {STARTUP_BUDGET_MS})")
+    for name, ms in sorted(measured["startup"].items()):
+        if name != "total":
+            print(f"  {name:<20} {ms:8.1f} ms")
+
+    if import_ms > IMPORT_BUDGET_MS or startup_ms > STARTUP_BUDGET_MS:
+        print("❌ Over budget")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+COMMANDS = {
+    "sync-schema": sync_schema,
+    "reconcile-counts": reconcile_counts,
+    "dedupe-likes": dedupe_likes,
+    "migrate-favorites": migrate_favorites,
+    "check-startup": check_startup,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Food AI backend maintenance")
+    parser.add_argument("command", choices=COMMANDS)
+    args = parser.parse_args()
+    COMMANDS[args.command]()
@@ -0,0 +1,256 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ==============================================
+# 📈 Metrics (Prometheus text format, no client library)
+# ==============================================
+# Values are per worker process; Prometheus sums them across targets.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+_collectors = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict):
+        return tuple(labels.get(n, "") for n in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, (list(c), s, n)) for key, (c, s, n) in self._values.items()]
+        names = self.label_names + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+def register_collector(fn):
+    """``fn()`` -> list of ``(name, type, help, [(labels dict, value)])``,
+    called on every scrape (for values that live elsewhere, like cache stats)"""
+    _collectors.append(fn)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            print("❌ Metrics collector error:", e)
+            continue
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ==============================================
+# ⏱️ Stages (histogram + Server-Timing)
+# ==============================================
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency", ("method", "route", "status")
+)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds", "Time spent per processing stage", ("stage",)
+)
+EXTERNAL_REQUESTS = Counter(
+    "external_requests_total", "Calls to external APIs", ("api", "outcome")
+)
+EXTERNAL_UNITS = Counter(
+    "external_quota_units_total",
+    "Quota consumed at external APIs (Spoonacular points, DeepL characters, HF calls)",
+    ("api",),
+)
+EXTERNAL_QUOTA_LEFT = Gauge(
+    "external_quota_remaining", "Quota left as last reported by the API", ("api",)
+)
+
+# Stages of the current request: {stage: [total seconds, count]}
+_request_stages: ContextVar[dict | None] = ContextVar("request_stages", default=None)
+
+
+def start_request() -> dict:
+    stages = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_DURATION.observe(seconds, stage=name)
+    stages = _request_stages.get()
+    if stages is not None:
+        entry = stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block (sync or around awaits) as ``name``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def external_call(api: str):
+    """A stage plus an outcome count for one external API call.
+
+    Yields a dict; set ``call["outcome"]`` (e.g. via ``http_outcome``) when
+    the call returned but failed. Exceptions count as ``"error"``, calls
+    abandoned by the caller as ``"cancelled"``.
+    """
+    call = {"outcome": "ok"}
+    try:
+        with stage(api):
+            yield call
+    except asyncio.CancelledError:
+        call["outcome"] = "cancelled"
+        raise
+    except BaseException:
+        call["outcome"] = "error"
+        raise
+    finally:
+        EXTERNAL_REQUESTS.inc(api=api, outcome=call["outcome"])
+
+
+def http_outcome(response) -> str:
+    return "ok" if response.status_code < 400 else f"http_{response.status_code}"
+
+
+def server_timing(stages: dict, total: float) -> str:
+    parts = []
+    for name, (seconds, count) in stages.items():
+        desc = f';desc="x{count}"' if count > 1 else ""
+        parts.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ==============================================
+# 🗄️ SQL queries (SQLAlchemy engine events)
+# ==============================================
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record_stage("db", time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+# ==============================================
+# 🧊 Cache stats -> metric families
+# ==============================================
+def cache_families(stats_by_cache: dict) -> list:
+    """Families for ``{cache name: LRUCache/TTLCache-style stats dict}``"""
+    fields = [
+        ("cache_hits_total", "counter", "Cache hits", "hits"),
+        ("cache_stale_hits_total", "counter", "Stale cache hits (served while refreshing)", "stale_hits"),
+        ("cache_misses_total", "counter", "Cache misses", "misses"),
+        ("cache_evictions_total", "counter", "Cache evictions", "evictions"),
+        ("cache_entries", "gauge", "Entries in the cache", "size"),
+        ("cache_hit_ratio", "gauge", "Hits / lookups since start", "hit_rate"),
+    ]
+    families = []
+    for name, kind, help_text, field in fields:
+        samples = [
+            ({"cache": cache}, stats[field])
+            for cache, stats in stats_by_cache.items()
+            if field in stats
+        ]
+        if samples:
+            families.append((name, kind, help_text, samples))
+    return families
@@ -0,0 +1,119 @@
+import json
+import time
+
+from starlette.exceptions import HTTPException
+
+import metrics
+
+
+# ==============================================
+# 🚧 Request body size limit
+# ==============================================
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as-is (413)
+    # instead of turning it into a generic 400
+    def __init__(self):
+        super().__init__(status_code=413, detail="Upload too large")
+
+
+class MaxBodySizeMiddleware:
+    """Reject uploads to ``paths`` above ``max_bytes`` with 413.
+
+    Checks Content-Length up front, and counts bytes while the body streams in
+    for chunked uploads, so oversized requests never get fully buffered.
+    """
+
+    def __init__(self, app, max_bytes: int, paths=()):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge:
+            if not started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Upload too large"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# ==============================================
+# ⏱️ Server-Timing + request latency histogram
+# ==============================================
+class ServerTimingMiddleware:
+    """Add a ``Server-Timing`` header with the stages recorded during the
+    request (see ``metrics.stage``) and observe the request latency.
+
+    The header covers the time until the response starts; the histogram
+    covers the full response, body included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stages = metrics.start_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = metrics.server_timing(stages, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"server-timing", header.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            route = scope.get("route")
+            metrics.REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
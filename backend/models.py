@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from database import Base
 
@@ -14,7 +14,7 @@ class Users(Base):
 
     # Google login fields
     google_id = Column(String(255), nullable=True)
-    name = Column(String(255), nullable=True)
+    name = Column(String(255), nullable=True, index=True)
 
     # Email login
     email = Column(String(255), unique=True, nullable=False)
@@ -24,6 +24,28 @@ class Users(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+# =========================
+# User Favorite Foods
+# =========================
+
+class UserFavoriteFood(Base):
+    __tablename__ = "user_favorite_foods"
+    __table_args__ = (
+        # a user's favorites, in the order they picked them
+        UniqueConstraint("user_id", "food_name", name="uq_user_favorite_foods_user_food"),
+        Index("ix_user_favorite_foods_user_position", "user_id", "position"),
+        # "users who like X" and popularity counts
+        Index("ix_user_favorite_foods_food_user", "food_name", "user_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    food_name = Column(String(255), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 # =========================
 # Recommendations
 # =========================
@@ -47,6 +69,10 @@ class Recommendations(Base):
 
 class CommunityPost(Base):
     __tablename__ = "community_posts"
+    __table_args__ = (
+        # keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_community_posts_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -55,6 +81,11 @@ class CommunityPost(Base):
     dish_image = Column(Text, nullable=False)
     opinion = Column(Text)
 
+    # Denormalized; kept in step by the like/comment endpoints
+    # (python manage.py reconcile-counts recomputes them)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -64,6 +95,10 @@ class CommunityPost(Base):
 
 class PostLike(Base):
     __tablename__ = "post_likes"
+    __table_args__ = (
+        # one like per user per post; also serves "likes of post X" lookups
+        Index("uq_post_likes_post_user", "post_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("community_posts.id"), nullable=False)
@@ -76,9 +111,49 @@ class PostLike(Base):
 
 class PostComment(Base):
     __tablename__ = "post_comments"
+    __table_args__ = (
+        # keyset pagination of one post's comments
+        Index("ix_post_comments_post_created_at_id", "post_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("community_posts.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     comment = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# =========================
+# Translation Cache
+# =========================
+
+class TranslationCache(Base):
+    __tablename__ = "translation_cache"
+    __table_args__ = (
+        # TEXT columns can't be unique-indexed in MySQL, so key on a digest
+        UniqueConstraint("source_hash", "target_lang", name="uq_translation_source_lang"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_hash = Column(String(64), nullable=False)
+    target_lang = Column(String(8), nullable=False)
+
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0, index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# =========================
+# Food Images (Spoonacular lookups)
+# =========================
+
+class FoodImage(Base):
+    __tablename__ = "food_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), unique=True, nullable=False)  # normalized food name
+    image_url = Column(String(500), nullable=True)  # NULL = Spoonacular had none
+
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+
+# ==============================================
+# 🪣 Token buckets
+# ==============================================
+class TokenBucket:
+    """``capacity`` tokens, refilled continuously at ``rate`` per second.
+
+    A capacity of 0 means unlimited. Safe to share between the event loop
+    and threadpool workers.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        if self.unlimited:
+            return float("inf")
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def take(self, amount: float = 1, keep: float = 0) -> bool:
+        """Take ``amount`` tokens if at least ``keep`` would be left over"""
+        if self.unlimited:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens - amount < keep:
+                return False
+            self._tokens -= amount
+            return True
+
+    def give(self, amount: float):
+        """Return (or, if negative, charge) tokens, e.g. to correct an estimate"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def cap(self, tokens: float):
+        """Lower the level to ``tokens`` (e.g. what the server says is left)"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, tokens)
+
+    def wait_time(self, amount: float = 1, keep: float = 0) -> float:
+        """Seconds until ``take(amount, keep)`` could succeed (inf if never)"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill()
+            short = amount + keep - self._tokens
+        if short <= 0:
+            return 0.0
+        if self.rate <= 0 or amount + keep > self.capacity:
+            return float("inf")
+        return short / self.rate
+
+
+class RateLimited(Exception):
+    """No slot within the caller's deadline"""
+
+
+class PriorityLimiter:
+    """Request pacing through a TokenBucket where interactive callers go first.
+
+    Background callers only get a slot while no interactive caller is
+    waiting, and may wait indefinitely; interactive callers give up after
+    ``max_wait`` seconds with RateLimited. ``background`` may be a callable,
+    re-checked while waiting, so a background caller can be promoted (its
+    ``max_wait`` then counts from the promotion).
+    """
+
+    def __init__(self, rate: float, burst: float, max_wait: float):
+        self.bucket = TokenBucket(burst if rate > 0 else 0, rate)
+        self.max_wait = max_wait
+        self._interactive_waiting = 0
+
+    async def acquire(self, background=False):
+        is_background = background if callable(background) else (lambda: background)
+        while is_background():
+            if not self._interactive_waiting and self.bucket.take():
+                return
+            # short naps, so a promotion is noticed quickly
+            await asyncio.sleep(min(max(self.bucket.wait_time(), 0.005), 0.05))
+
+        if self.bucket.take():
+            return
+        deadline = time.monotonic() + self.max_wait
+        self._interactive_waiting += 1
+        try:
+            while not self.bucket.take():
+                wait = self.bucket.wait_time()
+                if time.monotonic() + wait > deadline:
+                    raise RateLimited(f"no slot within {self.max_wait}s")
+                await asyncio.sleep(max(wait, 0.005))
+        finally:
+            self._interactive_waiting -= 1
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.bucket.rate,
+            "tokens": None if self.bucket.unlimited else round(self.bucket.tokens, 2),
+            "interactive_waiting": self._interactive_waiting,
+        }
@@ -1,14 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 import models, database
-from auth_utils import hash_password, verify_password
-from auth_jwt import create_access_token
+from auth_utils import HashingBusy, hash_password, run_hashing, verify_and_update
+from auth_jwt import create_access_token, get_current_user
 
 router = APIRouter(prefix="/api", tags=["Auth"])
 
 
+async def _hashing(fn, *args):
+    try:
+        return await run_hashing(fn, *args)
+    except HashingBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+
+
 # =========================
 # Request Schemas
 # =========================
@@ -27,20 +39,20 @@ class LoginRequest(BaseModel):
 # Register API
 # =========================
 @router.post("/register")
-def register_user(
+async def register_user(
     request: RegisterRequest,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     # Check duplicate email
-    user = db.query(models.Users).filter(
-        models.Users.email == request.email
-    ).first()
+    user = await db.scalar(
+        select(models.Users).where(models.Users.email == request.email).limit(1)
+    )
 
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Hash password
-    hashed_pw = hash_password(request.password)
+    # Hash password (bcrypt runs on its own bounded pool)
+    hashed_pw = await _hashing(hash_password, request.password)
 
     # Create user
     new_user = models.Users(
@@ -51,8 +63,8 @@ def register_user(
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # DEBUG LOG (you can remove later)
     print("🔥 REGISTER DEBUG USER_ID =", new_user.id)
@@ -69,13 +81,13 @@ def register_user(
 # Login API
 # =========================
 @router.post("/login")
-def login_user(
+async def login_user(
     request: LoginRequest,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    user = db.query(models.Users).filter(
-        models.Users.email == request.email
-    ).first()
+    user = await db.scalar(
+        select(models.Users).where(models.Users.email == request.email).limit(1)
+    )
 
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -83,9 +95,15 @@ def login_user(
     if user.password_hash is None:
         raise HTTPException(status_code=400, detail="Please login with Google")
 
-    if not verify_password(request.password, user.password_hash):
+    valid, new_hash = await _hashing(verify_and_update, request.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Stored with an older bcrypt cost: upgrade while we have the password
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": user.email})
 
     return {
@@ -93,3 +111,11 @@ def login_user(
         "name": user.name,
         "user_id": user.id
     }
+
+
+# =========================
+# Current User API
+# =========================
+@router.get("/me")
+async def read_current_user(user: dict = Depends(get_current_user)):
+    return user
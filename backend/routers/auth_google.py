@@ -1,34 +1,42 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-import requests
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from models import Users
+from services import google_auth_service
+from services.google_auth_service import GoogleAuthError, GoogleUnavailable
 
 router = APIRouter(prefix="/api", tags=["Google Auth"])
 
 @router.post("/google")
-def google_login(data: dict, db: Session = Depends(get_db)):
+async def google_login(data: dict, db: AsyncSession = Depends(get_async_db)):
     access_token = data.get("access_token")
+    id_token = data.get("id_token")
 
-    if not access_token:
+    if not access_token and not id_token:
         raise HTTPException(status_code=400, detail="Access token missing")
 
-    # 1️⃣ Get user info from Google
-    google_info = requests.get(
-        "https://www.googleapis.com/oauth2/v3/userinfo",
-        headers={"Authorization": f"Bearer {access_token}"}
-    ).json()
-
-    google_id = google_info.get("sub")
-    email = google_info.get("email")
-    name = google_info.get("name")
-
-    if not email:
-        raise HTTPException(status_code=400, detail="Unable to fetch Google account info")
+    # 1️⃣ Get user info: ID token checked locally, else userinfo (cached)
+    try:
+        if id_token and google_auth_service.GOOGLE_CLIENT_IDS:
+            google_info = await google_auth_service.verify_id_token(id_token)
+        elif access_token:
+            google_info = await google_auth_service.get_userinfo(access_token)
+        else:
+            raise GoogleAuthError("ID token sign-in is not configured")
+    except GoogleAuthError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GoogleUnavailable as e:
+        print("❌ Google sign-in error:", e)
+        raise HTTPException(status_code=503, detail="Google sign-in is unavailable, please try again")
+
+    google_id = google_info["google_id"]
+    email = google_info["email"]
+    name = google_info["name"]
 
     # 2️⃣ Check if user exists (Google OR normal)
-    user = db.query(Users).filter(Users.email == email).first()
+    user = await db.scalar(select(Users).where(Users.email == email).limit(1))
 
     # 3️⃣ Create new Google user
     if not user:
@@ -39,8 +47,8 @@ def google_login(data: dict, db: Session = Depends(get_db)):
             password_hash=None  # Google users don't use password
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         user = new_user
 
     # 4️⃣ Return user
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List
-from database import get_db
+from database import get_async_db
 import models
+from services import feed_service, write_buffer
 
 router = APIRouter(prefix="/api/community", tags=["Community"])
 
@@ -29,7 +30,7 @@ class CommentRequest(BaseModel):
 # =====================
 
 @router.post("/post")
-def create_post(request: CreatePostRequest, db: Session = Depends(get_db)):
+async def create_post(request: CreatePostRequest, db: AsyncSession = Depends(get_async_db)):
     post = models.CommunityPost(
         user_id=request.user_id,
         dish_name=request.dish_name,
@@ -37,8 +38,8 @@ def create_post(request: CreatePostRequest, db: Session = Depends(get_db)):
         opinion=request.opinion
     )
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    await db.refresh(post)
     return {"message": "Post created", "post_id": post.id}
 
 
@@ -47,40 +48,16 @@ def create_post(request: CreatePostRequest, db: Session = Depends(get_db)):
 # =====================
 
 @router.get("/posts")
-def get_posts(db: Session = Depends(get_db)):
-    posts = (
-        db.query(
-            models.CommunityPost,
-        )
-        .order_by(models.CommunityPost.created_at.desc())
-        .all()
-    )
-
-    result = []
-    for post in posts:
-        likes_count = (
-            db.query(models.PostLike)
-            .filter(models.PostLike.post_id == post.id)
-            .count()
-        )
-        comments_count = (
-            db.query(models.PostComment)
-            .filter(models.PostComment.post_id == post.id)
-            .count()
-        )
-
-        result.append({
-            "id": post.id,
-            "dish_name": post.dish_name,
-            "dish_image": post.dish_image,
-            "opinion": post.opinion,
-            "user_id": post.user_id,
-            "likes": likes_count,
-            "comments": comments_count,
-            "created_at": post.created_at,
-        })
-
-    return result
+async def get_posts(
+    limit: int = Query(feed_service.FEED_PAGE_SIZE, ge=1, le=feed_service.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        page, queued = await write_buffer.read(db.run_sync, feed_service.build_feed, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return write_buffer.overlay_feed(page, queued)
 
 
 # =====================
@@ -88,22 +65,18 @@ def get_posts(db: Session = Depends(get_db)):
 # =====================
 
 @router.post("/post/{post_id}/like")
-def like_post(post_id: int, user_id: int, db: Session = Depends(get_db)):
-    exists = (
-        db.query(models.PostLike)
-        .filter(
-            models.PostLike.post_id == post_id,
-            models.PostLike.user_id == user_id
-        )
-        .first()
-    )
-
-    if exists:
+async def like_post(post_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    if write_buffer.WRITE_BEHIND:
+        if (write_buffer.is_queued_like(post_id, user_id)
+                or await db.run_sync(feed_service.has_like, post_id, user_id)
+                or not write_buffer.enqueue_like(post_id, user_id)):
+            raise HTTPException(status_code=400, detail="Already liked")
+        return {"message": "Liked"}
+
+    if not await db.run_sync(feed_service.like_and_count, post_id, user_id):
         raise HTTPException(status_code=400, detail="Already liked")
 
-    like = models.PostLike(post_id=post_id, user_id=user_id)
-    db.add(like)
-    db.commit()
+    await db.commit()
     return {"message": "Liked"}
 
 
@@ -112,16 +85,15 @@ def like_post(post_id: int, user_id: int, db: Session = Depends(get_db)):
 # =====================
 
 @router.post("/post/{post_id}/comment")
-def comment_post(
+async def comment_post(
     post_id: int,
     request: CommentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    comment = models.PostComment(
-        post_id=post_id,
-        user_id=request.user_id,
-        comment=request.comment
-    )
-    db.add(comment)
-    db.commit()
+    if write_buffer.WRITE_BEHIND:
+        write_buffer.enqueue_comment(post_id, request.user_id, request.comment)
+        return {"message": "Comment added"}
+
+    await db.run_sync(feed_service.add_comment, post_id, request.user_id, request.comment)
+    await db.commit()
     return {"message": "Comment added"}
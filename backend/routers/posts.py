@@ -1,17 +1,16 @@
-import os
-import uuid
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Request, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from typing import List
 
-from database import get_db
+from database import get_async_db
 import models
+from services import feed_service, image_utils, upload_storage, write_buffer
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
-UPLOAD_DIR = "backend/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # -------------------------------------------
 # Upload a Post (IMAGE BASED)
 # -------------------------------------------
@@ -20,14 +19,15 @@ async def create_post(
     user_id: int = Form(...),
     caption: str = Form(""),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    file_ext = file.filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
+    # Streamed to disk under its content hash (duplicates stored once)
+    try:
+        file_name = await upload_storage.save_upload(file)
+    except image_utils.ImageRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    await upload_storage.create_renditions(file_name)
 
     new_post = models.CommunityPost(
         user_id=user_id,
@@ -37,8 +37,8 @@ async def create_post(
     )
 
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    await db.commit()
+    await db.refresh(new_post)
 
     return {
         "message": "Post created",
@@ -48,93 +48,124 @@ async def create_post(
 # -------------------------------------------
 # Serve uploaded images
 # -------------------------------------------
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LEGACY_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
 @router.get("/uploads/{filename}")
-def get_uploaded_file(filename: str):
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    if not os.path.exists(file_path):
+async def get_uploaded_file(filename: str, request: Request):
+    meta = await upload_storage.file_metadata(filename)
+    if meta is None:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+
+    stat_result = meta["stat"]
+    headers = {
+        "ETag": meta["etag"],
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if meta["immutable"] else LEGACY_CACHE_CONTROL,
+    }
+    if _not_modified(request, meta["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse handles Range / If-Range; stat_result skips its own stat
+    return FileResponse(meta["path"], headers=headers, stat_result=stat_result)
 
 # -------------------------------------------
 # Community Feed
 # -------------------------------------------
 @router.get("/feed")
-def get_feed(db: Session = Depends(get_db)):
-    posts = (
-        db.query(models.CommunityPost)
-        .order_by(models.CommunityPost.created_at.desc())
-        .all()
-    )
-
-    result = []
-
-    for post in posts:
-        likes = (
-            db.query(models.PostLike)
-            .filter(models.PostLike.post_id == post.id)
-            .count()
-        )
-
-        comments = (
-            db.query(models.PostComment)
-            .filter(models.PostComment.post_id == post.id)
-            .count()
-        )
-
-        result.append({
-            "id": post.id,
-            "dish_name": post.dish_name,
-            "dish_image": post.dish_image,
-            "opinion": post.opinion,
-            "likes": likes,
-            "comments": comments,
-            "created_at": post.created_at,
-        })
-
-    return result
+async def get_feed(
+    limit: int = Query(feed_service.FEED_PAGE_SIZE, ge=1, le=feed_service.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        page, queued = await write_buffer.read(db.run_sync, feed_service.build_feed, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return write_buffer.overlay_feed(page, queued)
 
 # -------------------------------------------
 # Like a Post
 # -------------------------------------------
 @router.post("/{post_id}/like")
-def like_post(
+async def like_post(
     post_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    existing = (
-        db.query(models.PostLike)
-        .filter_by(post_id=post_id, user_id=user_id)
-        .first()
-    )
-
-    if existing:
+    if write_buffer.WRITE_BEHIND:
+        if (write_buffer.is_queued_like(post_id, user_id)
+                or await db.run_sync(feed_service.has_like, post_id, user_id)
+                or not write_buffer.enqueue_like(post_id, user_id)):
+            return {"message": "Already liked"}
+        return {"message": "Liked"}
+
+    if not await db.run_sync(feed_service.like_and_count, post_id, user_id):
         return {"message": "Already liked"}
 
-    like = models.PostLike(post_id=post_id, user_id=user_id)
-    db.add(like)
-    db.commit()
+    await db.commit()
 
     return {"message": "Liked"}
 
+# -------------------------------------------
+# Like / Unlike several posts at once
+# -------------------------------------------
+class LikeOp(BaseModel):
+    post_id: int
+    like: bool = True
+
+
+class BulkLikeRequest(BaseModel):
+    user_id: int
+    ops: List[LikeOp] = Field(..., max_length=100)
+
+
+@router.post("/likes/bulk")
+async def bulk_like(request: BulkLikeRequest, db: AsyncSession = Depends(get_async_db)):
+    if write_buffer.WRITE_BEHIND:
+        # queued likes must land before these ops are applied on top
+        await write_buffer.flush()
+    results = await db.run_sync(
+        feed_service.apply_like_ops,
+        request.user_id,
+        [(op.post_id, op.like) for op in request.ops],
+    )
+    await db.commit()
+    return {"results": results}
+
 # -------------------------------------------
 # Comment on Post
 # -------------------------------------------
 @router.post("/{post_id}/comment")
-def comment_post(
+async def comment_post(
     post_id: int,
     user_id: int,
     comment: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    new_comment = models.PostComment(
-        post_id=post_id,
-        user_id=user_id,
-        comment=comment
-    )
+    if write_buffer.WRITE_BEHIND:
+        write_buffer.enqueue_comment(post_id, user_id, comment)
+        return {"message": "Comment added"}
 
-    db.add(new_comment)
-    db.commit()
+    await db.run_sync(feed_service.add_comment, post_id, user_id, comment)
+    await db.commit()
 
     return {"message": "Comment added"}
 
@@ -142,15 +173,16 @@ def comment_post(
 # Get Comments
 # -------------------------------------------
 @router.get("/{post_id}/comments")
-def get_comments(
+async def get_comments(
     post_id: int,
-    db: Session = Depends(get_db)
+    limit: int = Query(feed_service.COMMENTS_PAGE_SIZE, ge=1, le=feed_service.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    comments = (
-        db.query(models.PostComment)
-        .filter_by(post_id=post_id)
-        .order_by(models.PostComment.created_at.asc())
-        .all()
-    )
-
-    return comments
+    try:
+        page, queued = await write_buffer.read(
+            db.run_sync, feed_service.build_comments, post_id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return write_buffer.overlay_comments(page, post_id, queued)
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+import http_client
+import metrics
+
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "remote")  # remote | local
+
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+HUGGINGFACE_MODEL = os.getenv("HUGGINGFACE_MODEL")
+HUGGINGFACE_BASE_URL = os.getenv("HUGGINGFACE_BASE_URL", "https://router.huggingface.co")
+
+# Local backend: an ONNX (.onnx) or TorchScript (.pt/.pth) image classifier.
+# Needs numpy plus onnxruntime or torch (requirements-local-classifier.txt).
+CLASSIFIER_MODEL_PATH = os.getenv("CLASSIFIER_MODEL_PATH")
+CLASSIFIER_LABELS_PATH = os.getenv("CLASSIFIER_LABELS_PATH")
+CLASSIFIER_INPUT_SIZE = int(os.getenv("CLASSIFIER_INPUT_SIZE", "224"))
+CLASSIFIER_MAX_BATCH = int(os.getenv("CLASSIFIER_MAX_BATCH", "16"))
+CLASSIFIER_MAX_WAIT_MS = float(os.getenv("CLASSIFIER_MAX_WAIT_MS", "5"))
+CLASSIFIER_TOP_K = 5
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class ClassifierError(Exception):
+    pass
+
+
+# ==============================================
+# 🌐 Remote backend (HuggingFace inference router)
+# ==============================================
+class RemoteClassifier:
+    name = "remote"
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def classify(self, jpeg_bytes: bytes) -> list[dict]:
+        hf_url = f"{HUGGINGFACE_BASE_URL}/hf-inference/models/{HUGGINGFACE_MODEL}"
+        headers = {
+            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+            "Content-Type": "image/jpeg",
+        }
+
+        print("🚀 Sending image to HuggingFace...")
+        with metrics.external_call("huggingface") as call:
+            res = await http_client.post(hf_url, headers=headers, content=jpeg_bytes, timeout=60)
+            call["outcome"] = metrics.http_outcome(res)
+        metrics.EXTERNAL_UNITS.inc(api="huggingface")
+
+        try:
+            pred = res.json()
+        except ValueError:
+            raise ClassifierError("Invalid HuggingFace response")
+
+        if not pred or not isinstance(pred, list):
+            raise ClassifierError("No prediction")
+        return pred
+
+
+# ==============================================
+# ⚡ Micro-batching scheduler
+# ==============================================
+class MicroBatcher:
+    """Collects concurrent submissions for up to ``max_wait_ms`` (or until
+    ``max_batch_size`` items) and runs them through ``run_batch`` in one call.
+
+    ``run_batch`` takes a list of items and returns one result per item. It is
+    CPU-bound, so it runs on a single dedicated thread.
+    """
+
+    def __init__(self, run_batch, max_batch_size: int = 16, max_wait_ms: float = 5):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+
+    async def submit(self, item):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # callers that gave up (client disconnected) don't need a slot
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.run_batch, [item for item, _ in batch]
+                )
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+# ==============================================
+# 🖥️ Local backend (CPU model, loaded once)
+# ==============================================
+def load_labels(path: str) -> list[str]:
+    """Labels as one-per-line text, a JSON list, or a HF config.json (id2label)"""
+    with open(path, encoding="utf-8") as f:
+        if not path.endswith(".json"):
+            return [line.strip() for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        id2label = data.get("id2label", data)
+        return [id2label[k] for k in sorted(id2label, key=int)]
+    return list(data)
+
+
+def load_model(path: str):
+    """Return a callable mapping an (N, 3, H, W) float32 array to (N, C) logits"""
+    if path.endswith(".onnx"):
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        return lambda batch: session.run(None, {input_name: batch})[0]
+
+    import torch
+
+    module = torch.jit.load(path, map_location="cpu").eval()
+
+    def run(batch):
+        with torch.inference_mode():
+            return module(torch.from_numpy(batch)).numpy()
+
+    return run
+
+
+class LocalClassifier:
+    """Runs ``model`` in-process behind a MicroBatcher.
+
+    ``model`` is any callable from an (N, 3, H, W) float32 array to (N, C)
+    logits, so tests can pass a tiny stub instead of a real network.
+    """
+
+    name = "local"
+
+    def __init__(self, model=None, labels: list[str] | None = None,
+                 input_size: int = CLASSIFIER_INPUT_SIZE,
+                 max_batch_size: int = CLASSIFIER_MAX_BATCH,
+                 max_wait_ms: float = CLASSIFIER_MAX_WAIT_MS):
+        self.model = model
+        self.labels = labels
+        self.input_size = input_size
+        self.batcher = MicroBatcher(self._run_batch, max_batch_size, max_wait_ms)
+
+    async def start(self):
+        if self.model is None:
+            if not CLASSIFIER_MODEL_PATH or not CLASSIFIER_LABELS_PATH:
+                raise ClassifierError(
+                    "CLASSIFIER_MODEL_PATH and CLASSIFIER_LABELS_PATH are required for the local backend"
+                )
+            loop = asyncio.get_running_loop()
+            self.model = await loop.run_in_executor(None, load_model, CLASSIFIER_MODEL_PATH)
+            self.labels = load_labels(CLASSIFIER_LABELS_PATH)
+            print(f"🧠 Loaded local classifier ({len(self.labels)} labels)")
+
+    async def close(self):
+        await self.batcher.close()
+
+    def _to_array(self, jpeg_bytes: bytes):
+        import numpy as np
+
+        image = Image.open(BytesIO(jpeg_bytes)).convert("RGB")
+        image = image.resize((self.input_size, self.input_size), Image.BILINEAR)
+        pixels = np.asarray(image, dtype=np.float32) / 255.0
+        pixels = (pixels - IMAGENET_MEAN) / IMAGENET_STD
+        return pixels.transpose(2, 0, 1)
+
+    def _run_batch(self, images: list[bytes]) -> list[list[dict]]:
+        import numpy as np
+
+        batch = np.stack([self._to_array(img) for img in images]).astype(np.float32)
+        logits = np.asarray(self.model(batch), dtype=np.float32)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        results = []
+        for row in probs:
+            top = np.argsort(row)[::-1][:CLASSIFIER_TOP_K]
+            results.append([
+                {"label": self.labels[i], "score": float(row[i])} for i in top
+            ])
+        return results
+
+    async def classify(self, jpeg_bytes: bytes) -> list[dict]:
+        if self.model is None:
+            raise ClassifierError("Local classifier not loaded")
+        return await self.batcher.submit(jpeg_bytes)
+
+
+# ==============================================
+# 🔌 Active backend
+# ==============================================
+_classifier = None
+
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        if CLASSIFIER_BACKEND == "local":
+            _classifier = LocalClassifier()
+        else:
+            _classifier = RemoteClassifier()
+    return _classifier
+
+
+def set_classifier(classifier):
+    """Swap the active backend (e.g. a LocalClassifier with a stub model)"""
+    global _classifier
+    _classifier = classifier
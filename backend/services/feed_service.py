@@ -0,0 +1,310 @@
+import base64
+import json
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, text, tuple_, update
+from sqlalchemy.orm import Session
+
+import models
+from services import upload_storage
+
+FEED_PAGE_SIZE = 20
+COMMENTS_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+# ==============================================
+# 🔖 Keyset cursors on (created_at, id)
+# ==============================================
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _after_cursor(query, created_col, id_col, cursor, descending: bool):
+    # Expanded row comparison so MySQL turns it into a range on the
+    # (created_at, id) index
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id),
+            ))
+        else:
+            query = query.filter(or_(
+                created_col > created_at,
+                and_(created_col == created_at, id_col > row_id),
+            ))
+    if descending:
+        return query.order_by(created_col.desc(), id_col.desc())
+    return query.order_by(created_col.asc(), id_col.asc())
+
+
+def _page(rows: list, limit: int, key):
+    """Trim the look-ahead row and build the next cursor from the last item"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if has_more else None
+    return rows, next_cursor
+
+
+# ==============================================
+# 📰 Community feed (one query per page)
+# ==============================================
+def feed_query(db: Session):
+    """Posts with their like/comment counts; never touches the likes/comments tables"""
+    return db.query(models.CommunityPost)
+
+
+def build_feed(db: Session, limit: int = FEED_PAGE_SIZE, cursor: str | None = None) -> dict:
+    query = _after_cursor(
+        feed_query(db),
+        models.CommunityPost.created_at,
+        models.CommunityPost.id,
+        cursor,
+        descending=True,
+    )
+    rows, next_cursor = _page(
+        query.limit(limit + 1).all(),
+        limit,
+        key=lambda post: (post.created_at, post.id),
+    )
+    return {
+        "items": [
+            {
+                "id": post.id,
+                "dish_name": post.dish_name,
+                "dish_image": post.dish_image,
+                **upload_storage.image_urls(post.dish_image),
+                "opinion": post.opinion,
+                "user_id": post.user_id,
+                "likes": post.likes_count,
+                "comments": post.comments_count,
+                "created_at": post.created_at,
+            }
+            for post in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+# ==============================================
+# 💬 Comments (oldest first)
+# ==============================================
+def build_comments(db: Session, post_id: int, limit: int = COMMENTS_PAGE_SIZE,
+                   cursor: str | None = None) -> dict:
+    query = _after_cursor(
+        db.query(models.PostComment).filter(models.PostComment.post_id == post_id),
+        models.PostComment.created_at,
+        models.PostComment.id,
+        cursor,
+        descending=False,
+    )
+    rows, next_cursor = _page(
+        query.limit(limit + 1).all(),
+        limit,
+        key=lambda c: (c.created_at, c.id),
+    )
+    return {
+        "items": [
+            {
+                "id": c.id,
+                "post_id": c.post_id,
+                "user_id": c.user_id,
+                "comment": c.comment,
+                "created_at": c.created_at,
+            }
+            for c in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+# ==============================================
+# 🔢 Denormalized counters
+# ==============================================
+def bump_counter(db: Session, post_id: int, column, delta: int = 1):
+    """Atomic ``col = col + delta`` in the caller's transaction"""
+    db.query(models.CommunityPost).filter(models.CommunityPost.id == post_id).update(
+        {column: column + delta}, synchronize_session=False
+    )
+
+
+def bump_counters(db: Session, column, deltas: dict):
+    """One executemany ``col = col + delta`` for ``{post_id: delta}``.
+
+    Rows are updated in id order so concurrent flushes lock them in the
+    same order.
+    """
+    params = [
+        {"post": post_id, "delta": delta}
+        for post_id, delta in sorted(deltas.items())
+        if delta
+    ]
+    if not params:
+        return
+    table = models.CommunityPost.__table__
+    col = table.c[column.key]
+    db.execute(
+        update(table).where(table.c.id == bindparam("post")).values({col: col + bindparam("delta")}),
+        params,
+    )
+
+
+def reconcile_counts(db: Session, batch_size: int = 1000) -> int:
+    """Recompute likes_count/comments_count from the source tables.
+
+    Works through the posts in id batches so no single UPDATE locks the whole
+    table. Returns the number of posts processed.
+    """
+    post = models.CommunityPost
+    likes = (
+        select(func.count(models.PostLike.id))
+        .where(models.PostLike.post_id == post.id)
+        .scalar_subquery()
+    )
+    comments = (
+        select(func.count(models.PostComment.id))
+        .where(models.PostComment.post_id == post.id)
+        .scalar_subquery()
+    )
+
+    last_id = db.query(func.max(post.id)).scalar() or 0
+    for start in range(0, last_id, batch_size):
+        db.execute(
+            update(post)
+            .where(post.id > start, post.id <= start + batch_size)
+            .values(likes_count=likes, comments_count=comments)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return db.query(func.count(post.id)).scalar()
+
+
+# ==============================================
+# ❤️ Likes (idempotent, backed by uq_post_likes_post_user)
+# ==============================================
+def add_like(db: Session, post_id: int, user_id: int) -> bool:
+    """Insert-if-absent in one statement; True if the like is new"""
+    stmt = (
+        insert(models.PostLike)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+        .values(post_id=post_id, user_id=user_id)
+    )
+    return db.execute(stmt).rowcount == 1
+
+
+def has_like(db: Session, post_id: int, user_id: int) -> bool:
+    """Point lookup on uq_post_likes_post_user"""
+    return db.query(
+        select(models.PostLike.id)
+        .where(models.PostLike.post_id == post_id, models.PostLike.user_id == user_id)
+        .exists()
+    ).scalar()
+
+
+def remove_like(db: Session, post_id: int, user_id: int) -> bool:
+    """True if a like was actually removed"""
+    stmt = delete(models.PostLike).where(
+        models.PostLike.post_id == post_id,
+        models.PostLike.user_id == user_id,
+    )
+    return db.execute(stmt).rowcount == 1
+
+
+def like_and_count(db: Session, post_id: int, user_id: int) -> bool:
+    """add_like + likes_count bump in the caller's transaction"""
+    if not add_like(db, post_id, user_id):
+        return False
+    bump_counter(db, post_id, models.CommunityPost.likes_count)
+    return True
+
+
+def add_comment(db: Session, post_id: int, user_id: int, comment: str):
+    """Insert a comment and bump comments_count in the caller's transaction"""
+    db.add(models.PostComment(post_id=post_id, user_id=user_id, comment=comment))
+    bump_counter(db, post_id, models.CommunityPost.comments_count)
+
+
+def add_likes(db: Session, pairs: list) -> Counter:
+    """Multi-row add_like for ``(post_id, user_id)`` pairs.
+
+    Returns the number of new likes per post. Pairs that already exist are
+    skipped. Each remaining pair is inserted on its own with add_like, so
+    only rows the INSERT IGNORE really added are counted, even if another
+    writer inserts the same pair after the pre-check.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return Counter()
+    like = models.PostLike
+    existing = set(
+        db.execute(
+            select(like.post_id, like.user_id).where(tuple_(like.post_id, like.user_id).in_(pairs))
+        ).all()
+    )
+    return Counter(
+        post_id
+        for post_id, user_id in pairs
+        if (post_id, user_id) not in existing and add_like(db, post_id, user_id)
+    )
+
+
+def add_comments(db: Session, rows: list[dict]) -> Counter:
+    """Multi-row add_comment for ``{post_id, user_id, comment}`` dicts;
+    returns the number of comments per post."""
+    if not rows:
+        return Counter()
+    db.execute(insert(models.PostComment), rows)
+    return Counter(row["post_id"] for row in rows)
+
+
+def apply_like_ops(db: Session, user_id: int, ops: list) -> list[dict]:
+    """Apply ``(post_id, like: bool)`` operations in order, in the caller's
+    transaction, with one counter UPDATE per touched post."""
+    deltas = {}
+    state = {}
+    for post_id, like in ops:
+        changed = add_like(db, post_id, user_id) if like else remove_like(db, post_id, user_id)
+        if changed:
+            deltas[post_id] = deltas.get(post_id, 0) + (1 if like else -1)
+        state[post_id] = like
+
+    for post_id, delta in deltas.items():
+        if delta:
+            bump_counter(db, post_id, models.CommunityPost.likes_count, delta)
+
+    return [
+        {"post_id": post_id, "liked": liked, "changed": bool(deltas.get(post_id))}
+        for post_id, liked in state.items()
+    ]
+
+
+def dedupe_likes(db: Session) -> int:
+    """Delete duplicate (post_id, user_id) likes, keeping the oldest row.
+
+    Needed once before uq_post_likes_post_user can be created on old data.
+    """
+    # the extra derived table lets MySQL delete from the table it reads
+    result = db.execute(text(
+        "DELETE FROM post_likes WHERE id NOT IN ("
+        " SELECT keep_id FROM ("
+        "  SELECT MIN(id) AS keep_id FROM post_likes GROUP BY post_id, user_id"
+        " ) AS keep"
+        ")"
+    ))
+    db.commit()
+    return result.rowcount
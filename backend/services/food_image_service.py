@@ -0,0 +1,117 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import mysql, sqlite
+from starlette.concurrency import run_in_threadpool
+
+import database
+import models
+from services import spoonacular_service
+from services.recipe_service import normalize_food_name
+
+FOOD_IMAGE_TTL = timedelta(seconds=int(os.getenv("FOOD_IMAGE_TTL", str(30 * 24 * 3600))))
+# "No image" answers are retried sooner
+FOOD_IMAGE_MISS_TTL = timedelta(seconds=int(os.getenv("FOOD_IMAGE_MISS_TTL", str(24 * 3600))))
+
+
+# ==============================================
+# 🖼️ Food images (food_images table, TTL via fetched_at)
+# ==============================================
+def _is_fresh(row, now: datetime) -> bool:
+    if row.fetched_at is None:
+        return False
+    fetched_at = row.fetched_at.replace(tzinfo=None)
+    ttl = FOOD_IMAGE_TTL if row.image_url else FOOD_IMAGE_MISS_TTL
+    return now - fetched_at < ttl
+
+
+def load_images(db, names: list[str]):
+    """Stored images for normalized names:
+    ``(fresh {name: url}, names to resolve, expired {name: url})``"""
+    rows = (
+        db.query(models.FoodImage)
+        .filter(models.FoodImage.name.in_(names))
+        .all()
+    )
+    now = datetime.utcnow()
+    fresh = {row.name: row.image_url for row in rows if _is_fresh(row, now)}
+    expired = {row.name: row.image_url for row in rows if row.name not in fresh}
+    return fresh, [n for n in names if n not in fresh], expired
+
+
+def _store_images(images: dict):
+    rows = [
+        {"name": name, "image_url": url, "fetched_at": datetime.utcnow()}
+        for name, url in images.items()
+    ]
+    db = database.SessionLocal()
+    try:
+        dialect = mysql if db.bind.dialect.name == "mysql" else sqlite
+        stmt = dialect.insert(models.FoodImage)
+        if dialect is mysql:
+            stmt = stmt.on_duplicate_key_update(
+                image_url=stmt.inserted.image_url,
+                fetched_at=stmt.inserted.fetched_at,
+            )
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={"image_url": stmt.excluded.image_url, "fetched_at": stmt.excluded.fetched_at},
+            )
+        db.execute(stmt, rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def resolve_images(names: list[str], background: bool = False) -> dict:
+    """Look names up on Spoonacular concurrently and store the answers.
+
+    Names whose lookup failed (or was throttled) are left out (and not stored).
+    """
+    results = await asyncio.gather(
+        *(spoonacular_service.search_food_image(n, background) for n in names),
+        return_exceptions=True,
+    )
+    images = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"❌ Image fetch error ({name}):", result)
+        else:
+            images[name] = result
+
+    if images:
+        try:
+            await run_in_threadpool(_store_images, images)
+        except Exception as e:
+            print("❌ Food image store error:", e)
+    return images
+
+
+def _load_images(names: list[str]):
+    db = database.SessionLocal()
+    try:
+        return load_images(db, names)
+    finally:
+        db.close()
+
+
+async def get_images(foods: list[str], background: bool = False) -> dict:
+    """``{food: image url or None}``; only stale/unknown names hit Spoonacular.
+
+    Expired images are still served for names Spoonacular couldn't resolve.
+    """
+    names = {f: normalize_food_name(f) for f in foods}
+    images, missing, expired = await run_in_threadpool(_load_images, list(set(names.values())))
+    if missing:
+        images = {**expired, **images, **await resolve_images(missing, background)}
+    return {food: images.get(name) for food, name in names.items()}
+
+
+async def prewarm(foods: list[str]):
+    """Resolve images for newly saved favorites (run as a background task)"""
+    try:
+        await get_images(foods, background=True)
+    except Exception as e:
+        print("❌ Food image prewarm error:", e)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+from jose import jwt, JWTError
+
+import http_client
+import metrics
+from cache import TTLCache
+from singleflight import SingleFlight
+
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# OAuth client ids (web/iOS/Android, comma separated). ID tokens are only
+# accepted when this is set, since their audience has to be checked.
+GOOGLE_CLIENT_IDS = [c.strip() for c in os.getenv("GOOGLE_CLIENT_IDS", "").split(",") if c.strip()]
+GOOGLE_TIMEOUT = float(os.getenv("GOOGLE_TIMEOUT", "5"))
+GOOGLE_PROFILE_TTL = int(os.getenv("GOOGLE_PROFILE_TTL", "300"))
+GOOGLE_PROFILE_CACHE_SIZE = int(os.getenv("GOOGLE_PROFILE_CACHE_SIZE", "10000"))
+
+JWKS_DEFAULT_MAX_AGE = 3600
+# Refresh in the background this long before the key set expires
+JWKS_REFRESH_MARGIN = 300
+# An unknown kid triggers at most one refetch per this many seconds
+JWKS_MIN_REFETCH = 60
+
+
+class GoogleAuthError(Exception):
+    pass
+
+
+class GoogleUnavailable(Exception):
+    pass
+
+
+def _profile(claims: dict) -> dict:
+    return {
+        "google_id": claims.get("sub"),
+        "email": claims.get("email"),
+        "name": claims.get("name"),
+    }
+
+
+# ==============================================
+# 👤 Access token -> profile (userinfo, short TTL)
+# ==============================================
+# keyed by a digest so raw tokens aren't kept around
+_profiles = TTLCache(GOOGLE_PROFILE_CACHE_SIZE, ttl=GOOGLE_PROFILE_TTL)
+# concurrent lookups of the same token share one userinfo call
+_inflight = SingleFlight()
+
+
+async def _fetch_userinfo(access_token: str) -> dict:
+    try:
+        with metrics.external_call("google_userinfo") as call:
+            res = await http_client.get(
+                GOOGLE_USERINFO_URL,
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=GOOGLE_TIMEOUT,
+            )
+            call["outcome"] = metrics.http_outcome(res)
+    except Exception as e:
+        raise GoogleUnavailable(str(e) or type(e).__name__)
+    if res.status_code >= 500:
+        raise GoogleUnavailable(f"userinfo returned {res.status_code}")
+    info = res.json() if res.status_code == 200 else {}
+    if not info.get("email"):
+        raise GoogleAuthError("Unable to fetch Google account info")
+    return _profile(info)
+
+
+async def _fetch_and_cache(key: str, access_token: str) -> dict:
+    profile = await _fetch_userinfo(access_token)
+    _profiles.set(key, profile)
+    return profile
+
+
+async def get_userinfo(access_token: str) -> dict:
+    """Profile for an OAuth access token; repeats within GOOGLE_PROFILE_TTL
+    (and concurrent retries) share one userinfo call. Failures aren't cached."""
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    profile = _profiles.get(key)
+    if profile is not None:
+        return profile
+
+    # a caller that disconnects doesn't cancel the call for the others
+    return await _inflight.run(key, lambda flight: _fetch_and_cache(key, access_token))
+
+
+# ==============================================
+# 🔏 ID tokens (verified offline against cached JWKS)
+# ==============================================
+_jwks = {"keys": {}, "expires_at": 0.0, "fetched_at": 0.0}
+_jwks_lock: asyncio.Lock | None = None
+_jwks_refresh: asyncio.Task | None = None
+
+
+def _max_age(cache_control: str) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else JWKS_DEFAULT_MAX_AGE
+
+
+async def refresh_jwks():
+    """Fetch Google's signing keys; on failure the current set is kept"""
+    global _jwks_lock
+    if _jwks_lock is None:
+        _jwks_lock = asyncio.Lock()
+    async with _jwks_lock:
+        res = await http_client.get(GOOGLE_JWKS_URL, timeout=GOOGLE_TIMEOUT)
+        res.raise_for_status()
+        now = time.time()
+        _jwks["keys"] = {key["kid"]: key for key in res.json()["keys"]}
+        _jwks["fetched_at"] = now
+        _jwks["expires_at"] = now + _max_age(res.headers.get("cache-control"))
+
+
+async def _refresh_quietly():
+    try:
+        await refresh_jwks()
+    except Exception as e:
+        print("❌ Google JWKS refresh failed:", e)
+
+
+def _schedule_refresh():
+    global _jwks_refresh
+    if _jwks_refresh is None or _jwks_refresh.done():
+        _jwks_refresh = asyncio.create_task(_refresh_quietly())
+
+
+async def _signing_key(kid: str):
+    now = time.time()
+    if not _jwks["keys"]:
+        try:
+            await refresh_jwks()
+        except Exception as e:
+            raise GoogleUnavailable(f"JWKS fetch failed: {e}")
+    elif now >= _jwks["expires_at"] - JWKS_REFRESH_MARGIN:
+        # serve the current keys; Google publishes new ones well ahead of use
+        _schedule_refresh()
+
+    key = _jwks["keys"].get(kid)
+    if key is None and now - _jwks["fetched_at"] >= JWKS_MIN_REFETCH:
+        await _refresh_quietly()
+        key = _jwks["keys"].get(kid)
+    return key
+
+
+async def verify_id_token(id_token: str) -> dict:
+    """Profile from a Google ID token, checked locally (signature, expiry,
+    issuer, audience, verified email)."""
+    if not GOOGLE_CLIENT_IDS:
+        raise GoogleAuthError("ID token sign-in is not configured")
+    try:
+        header = jwt.get_unverified_header(id_token)
+    except JWTError:
+        raise GoogleAuthError("Invalid ID token")
+
+    key = await _signing_key(header.get("kid"))
+    if key is None:
+        raise GoogleAuthError("Invalid ID token")
+
+    try:
+        # audience is checked below: python-jose takes a single one only
+        claims = jwt.decode(
+            id_token, key, algorithms=["RS256"], options={"verify_aud": False, "verify_at_hash": False}
+        )
+    except JWTError:
+        raise GoogleAuthError("Invalid ID token")
+
+    if claims.get("iss") not in GOOGLE_ISSUERS or claims.get("aud") not in GOOGLE_CLIENT_IDS:
+        raise GoogleAuthError("Invalid ID token")
+    if not claims.get("email") or claims.get("email_verified") not in (True, "true"):
+        raise GoogleAuthError("Unable to fetch Google account info")
+    return _profile(claims)
+
+
+def cache_stats() -> dict:
+    return {
+        "profiles": _profiles.stats(),
+        "jwks_keys": len(_jwks["keys"]),
+        "jwks_expires_in": max(0, round(_jwks["expires_at"] - time.time())),
+    }
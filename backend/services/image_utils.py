@@ -0,0 +1,113 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Decodes waiting for a worker; past this, callers wait instead of queueing more pixels
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", str(IMAGE_WORKERS * 4)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class ImageRejected(Exception):
+    pass
+
+
+# ==============================================
+# 🔍 Upload checks (before any pixel is decoded)
+# ==============================================
+# By the time an endpoint runs, Starlette has already spooled the whole
+# multipart body into the UploadFile; only MaxBodySizeMiddleware stops a
+# request while it is still streaming. These checks keep junk and
+# oversized files away from the decoder.
+def sniff_image_type(head: bytes):
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "heic"
+    if head[:2] == b"BM":
+        return "bmp"
+    return None
+
+
+async def read_image_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an (already received) UploadFile from its spool in chunks.
+
+    Non-images are rejected by their magic bytes after the first chunk,
+    without copying the rest; files over ``max_bytes`` are rejected without
+    holding more than ``max_bytes`` in memory.
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunks and sniff_image_type(chunk) is None:
+            raise ImageRejected("Unsupported image type")
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageRejected("Image too large")
+        chunks.append(chunk)
+    if not chunks:
+        raise ImageRejected("Empty upload")
+    return b"".join(chunks)
+
+
+# ==============================================
+# 🖼️ Reduced-scale decode + resize
+# ==============================================
+def load_thumbnail(source, size=(512, 512)) -> Image.Image:
+    """Decode just enough pixels for a ``size`` thumbnail.
+
+    ``source`` is the encoded bytes or a file path. JPEGs use draft mode, so
+    libjpeg decodes at 1/2, 1/4 or 1/8 scale straight away instead of
+    materialising all 12 MP.
+    """
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageRejected("Image too large")
+
+    image.draft("RGB", size)
+    image = image.convert("RGB")
+    image.thumbnail(size)
+    return image
+
+
+def encode_jpeg(image: Image.Image, quality: int = 85) -> bytes:
+    buf = BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+# ==============================================
+# 🧵 Bounded worker pool
+# ==============================================
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+_pending: asyncio.Semaphore | None = None
+
+
+async def run_in_pool(fn, *args):
+    """Run CPU-heavy image work off the event loop, at most IMAGE_MAX_PENDING at a time"""
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(IMAGE_MAX_PENDING)
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
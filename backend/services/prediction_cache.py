@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+from PIL import Image
+
+from cache import LRUCache
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "2048"))
+# Near-duplicate matching (perceptual hash) is opt-in
+PREDICTION_PHASH = os.getenv("PREDICTION_PHASH", "0") == "1"
+PREDICTION_PHASH_MAX_DISTANCE = int(os.getenv("PREDICTION_PHASH_MAX_DISTANCE", "4"))
+
+
+# ==============================================
+# 🧊 Prediction cache (same photo → same label)
+# ==============================================
+# Keyed by the digest of the normalized 512px JPEG predict_food sends to the
+# model, so re-submitting the same upload never costs an inference call.
+
+_exact = LRUCache(PREDICTION_CACHE_SIZE)
+_near = LRUCache(PREDICTION_CACHE_SIZE)
+near_hits = 0
+
+
+def image_digest(jpeg_bytes: bytes) -> str:
+    return hashlib.sha256(jpeg_bytes).hexdigest()
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """64-bit difference hash (dHash): survives re-encoding and small resizes"""
+    small = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def lookup(digest: str, phash: int | None = None):
+    """Return the cached ``(label, score)`` for an image, or None"""
+    global near_hits
+    hit = _exact.get(digest)
+    if hit is not None or phash is None:
+        return hit
+
+    best, best_distance = None, PREDICTION_PHASH_MAX_DISTANCE + 1
+    for other, prediction in _near.items():
+        distance = (phash ^ other).bit_count()
+        if distance < best_distance:
+            best, best_distance = prediction, distance
+    if best is not None:
+        near_hits += 1
+        _exact.set(digest, best)
+    return best
+
+
+def store(digest: str, prediction, phash: int | None = None):
+    _exact.set(digest, prediction)
+    if phash is not None:
+        _near.set(phash, prediction)
+
+
+def cache_stats() -> dict:
+    return {
+        **_exact.stats(),
+        "phash_enabled": PREDICTION_PHASH,
+        "phash_size": len(_near),
+        "near_hits": near_hits,
+    }
@@ -0,0 +1,81 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+
+# ==============================================
+# ⭐ Favorite foods (user_favorite_foods)
+# ==============================================
+def clean_foods(foods: list[str]) -> list[str]:
+    """Trimmed, non-empty, de-duplicated (case-insensitive), order kept"""
+    seen = set()
+    cleaned = []
+    for food in foods:
+        food = (food or "").strip()
+        if food and food.lower() not in seen:
+            seen.add(food.lower())
+            cleaned.append(food)
+    return cleaned
+
+
+def save_favorites(db: Session, user_id: int, foods: list[str]) -> list[str]:
+    """Replace a user's favorites in one transaction"""
+    foods = clean_foods(foods)
+    db.query(models.UserFavoriteFood).filter(
+        models.UserFavoriteFood.user_id == user_id
+    ).delete(synchronize_session=False)
+    db.add_all([
+        models.UserFavoriteFood(user_id=user_id, food_name=food, position=i)
+        for i, food in enumerate(foods)
+    ])
+    db.commit()
+    return foods
+
+
+def favorites_by_user_id(db: Session, user_id: int) -> list[str]:
+    rows = (
+        db.query(models.UserFavoriteFood.food_name)
+        .filter(models.UserFavoriteFood.user_id == user_id)
+        .order_by(models.UserFavoriteFood.position)
+        .all()
+    )
+    return [food for (food,) in rows]
+
+
+def favorites_by_username(db: Session, username: str) -> list[str]:
+    # users.name isn't unique: like the old fetchone(), use one user (the
+    # first registered) rather than merging everyone with that name
+    user_id = (
+        db.query(func.min(models.Users.id))
+        .filter(models.Users.name == username)
+        .scalar()
+    )
+    if user_id is None:
+        return []
+    return favorites_by_user_id(db, user_id)
+
+
+def users_who_like(db: Session, food_name: str, limit: int = 50) -> list[dict]:
+    rows = (
+        db.query(models.Users.id, models.Users.name)
+        .join(models.UserFavoriteFood, models.UserFavoriteFood.user_id == models.Users.id)
+        .filter(models.UserFavoriteFood.food_name == food_name.strip())
+        .order_by(models.UserFavoriteFood.user_id)
+        .limit(limit)
+        .all()
+    )
+    return [{"user_id": user_id, "name": name} for user_id, name in rows]
+
+
+def popular_foods(db: Session, limit: int = 10) -> list[dict]:
+    # GROUP BY food_name is served from ix_user_favorite_foods_food_user
+    fans = func.count(models.UserFavoriteFood.user_id).label("fans")
+    rows = (
+        db.query(models.UserFavoriteFood.food_name, fans)
+        .group_by(models.UserFavoriteFood.food_name)
+        .order_by(fans.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{"name": food, "fans": count} for food, count in rows]
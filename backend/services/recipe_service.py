@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+from cache import TTLCache
+from singleflight import SingleFlight
+from services import spoonacular_service, translation_service
+
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "1000"))
+RECIPE_CACHE_TTL = int(os.getenv("RECIPE_CACHE_TTL", str(24 * 3600)))
+RECIPE_CACHE_STALE_TTL = int(os.getenv("RECIPE_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+# "No recipe" answers are cached too, but not for long
+RECIPE_NOT_FOUND_TTL = int(os.getenv("RECIPE_NOT_FOUND_TTL", "3600"))
+# Answers with untranslated (English) "JP" fields are retried soon
+RECIPE_UNTRANSLATED_TTL = int(os.getenv("RECIPE_UNTRANSLATED_TTL", "300"))
+
+
+# ==============================================
+# 🍳 Build recipe payload (EN + JP)
+# ==============================================
+async def build_recipe(info: dict, extra_texts=()):
+    """Turn a Spoonacular /information payload into our recipe dict.
+
+    Every string that needs Japanese (title, instructions, ingredient names and
+    any ``extra_texts``) goes to DeepL in one batch. Returns the recipe, the
+    translations of ``extra_texts`` and whether every translation succeeded.
+    """
+    title_en = info.get("title", "")
+    instructions_en = info.get("instructions", "No instructions available.")
+    ingredients_raw = info.get("extendedIngredients", [])
+    ingredient_names = [ing.get("name", "") for ing in ingredients_raw]
+
+    extra_texts = list(extra_texts)
+    translated, failed = await translation_service.translate_batch_with_failures(
+        extra_texts + [title_en, instructions_en] + ingredient_names
+    )
+    extra_jp = translated[:len(extra_texts)]
+    title_jp, instructions_jp, *ingredients_jp = translated[len(extra_texts):]
+
+    recipe = {
+        "name_en": title_en,
+        "name_jp": title_jp,
+        "image": info.get("image"),
+        "instructions_en": instructions_en,
+        "instructions_jp": instructions_jp,
+        "ingredients_en": [
+            {
+                "ingredient": ing.get("name"),
+                "measure": f"{ing.get('amount', '')} {ing.get('unit', '')}".strip()
+            }
+            for ing in ingredients_raw
+        ],
+        "ingredients_jp": ingredients_jp,
+        "sourceUrl": info.get("sourceUrl"),
+    }
+    return recipe, extra_jp, not failed
+
+
+# ==============================================
+# 🧊 Recipe cache (TTL + stale-while-revalidate)
+# ==============================================
+_cache = TTLCache(RECIPE_CACHE_SIZE, RECIPE_CACHE_TTL, RECIPE_CACHE_STALE_TTL)
+_refreshing: dict[str, asyncio.Task] = {}
+# Misses being fetched; concurrent requests for the same dish share one, and
+# it finishes (and is cached) even if every caller goes away
+_fetching = SingleFlight(cancel_orphans=False)
+
+
+def normalize_food_name(food_name: str) -> str:
+    return " ".join(food_name.replace("_", " ").lower().split())
+
+
+async def _fetch_recipe(food_name: str, background: bool = False):
+    """``((recipe or None, food_name_jp), fully translated?)``"""
+    recipe_id = await spoonacular_service.find_recipe_id(food_name, background)
+    if not recipe_id:
+        (food_name_jp,), failed = await translation_service.translate_batch_with_failures([food_name])
+        return (None, food_name_jp), not failed
+
+    info = await spoonacular_service.get_recipe_information(recipe_id, background)
+    recipe, (food_name_jp,), complete = await build_recipe(info, extra_texts=[food_name])
+    return (recipe, food_name_jp), complete
+
+
+def _store(key: str, value, complete: bool = True):
+    recipe, _ = value
+    if not complete:
+        # DeepL failed somewhere: English stands in for Japanese; don't keep it
+        _cache.set(key, value, ttl=RECIPE_UNTRANSLATED_TTL, stale_ttl=0)
+    elif recipe is None:
+        _cache.set(key, value, ttl=RECIPE_NOT_FOUND_TTL, stale_ttl=0)
+    else:
+        _cache.set(key, value)
+
+
+async def _refresh(key: str, food_name: str):
+    try:
+        value, complete = await _fetch_recipe(food_name, background=True)
+        if complete:
+            _store(key, value)
+        else:
+            # the stale copy is better than an untranslated one
+            print(f"⏳ Recipe refresh kept stale copy ({food_name}): translation failed")
+    except spoonacular_service.Throttled as e:
+        # refreshes only spend points outside the interactive reserve
+        print(f"⏳ Recipe refresh deferred ({food_name}):", e)
+    except Exception as e:
+        # keep serving the stale copy until it expires
+        print(f"❌ Recipe refresh failed ({food_name}):", e)
+    finally:
+        _refreshing.pop(key, None)
+
+
+async def _fetch_and_store(key: str, food_name: str):
+    value, complete = await _fetch_recipe(food_name)
+    _store(key, value, complete)
+    return value
+
+
+async def get_recipe(food_name: str):
+    """Return ``(recipe or None, food_name_jp)`` for a dish, cached per name.
+
+    Stale entries are returned immediately while one background task per dish
+    refreshes them. Raises ``spoonacular_service.Throttled`` on a miss when
+    the Spoonacular budget has no room (see ``get_recipe_or_name``).
+    """
+    key = normalize_food_name(food_name)
+    hit = _cache.lookup(key)
+    if hit is not None:
+        value, stale = hit
+        if stale and key not in _refreshing:
+            _refreshing[key] = asyncio.create_task(_refresh(key, food_name))
+        return value
+
+    return await _fetching.run(key, lambda flight: _fetch_and_store(key, food_name))
+
+
+async def get_recipe_or_name(food_name: str):
+    """Like ``get_recipe``, but out of Spoonacular budget it degrades to
+    ``(None, food_name_jp, False)`` instead of failing; the last item says
+    whether the recipe lookup actually ran."""
+    try:
+        recipe, food_name_jp = await get_recipe(food_name)
+        return recipe, food_name_jp, True
+    except spoonacular_service.Throttled as e:
+        print(f"⏳ Recipe lookup skipped ({food_name}):", e)
+        return None, await translation_service.translate_to_japanese(food_name), False
+
+
+def cache_stats() -> dict:
+    return {**_cache.stats(), "refreshing": len(_refreshing), "fetching": len(_fetching)}
@@ -1,14 +1,30 @@
+import asyncio
 import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+import config  # noqa: F401  (.env)
+import http_client
+import metrics
+from rate_limit import PriorityLimiter, RateLimited, TokenBucket
+from singleflight import Flight, SingleFlight
+
 API_KEY = os.getenv("SPOONACULAR_API_KEY")
 
-BASE_URL = "https://api.spoonacular.com"
+BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
+
+# Points per day on your plan (0 = don't track). The budget refills evenly
+# over the day and follows the X-API-Quota-Left the API reports.
+SPOONACULAR_DAILY_POINTS = float(os.getenv("SPOONACULAR_DAILY_POINTS", "150"))
+# Share of the budget that only interactive lookups may spend
+SPOONACULAR_BACKGROUND_RESERVE = float(os.getenv("SPOONACULAR_BACKGROUND_RESERVE", "0.3"))
+# Request pacing (0 = none, the default: the points budget already limits
+# spend); interactive calls wait at most MAX_WAIT seconds for a slot
+SPOONACULAR_RPS = float(os.getenv("SPOONACULAR_RPS", "0"))
+SPOONACULAR_BURST = float(os.getenv("SPOONACULAR_BURST", "5"))
+SPOONACULAR_MAX_WAIT = float(os.getenv("SPOONACULAR_MAX_WAIT", "2"))
 
 def classify_food_image(file):
     """Send image to Spoonacular to classify food type"""
+    import requests  # legacy sync helpers only; kept out of app import time
     url = f"{BASE_URL}/food/images/classify?apiKey={API_KEY}"
     files = {"file": (file.filename, file.file, file.content_type)}
     response = requests.post(url, files=files)
@@ -16,7 +32,193 @@ def classify_food_image(file):
 
 def search_recipes(food_name):
     """Search recipes based on food name"""
+    import requests
     url = f"{BASE_URL}/recipes/complexSearch"
     params = {"apiKey": API_KEY, "query": food_name, "number": 5}
     response = requests.get(url, params=params)
     return response.json()
+
+
+# ==============================================
+# 🪙 Points budget, pacing and coalescing
+# ==============================================
+class Throttled(Exception):
+    """Out of points or request slots; callers fall back to what they have"""
+
+
+_points = TokenBucket(SPOONACULAR_DAILY_POINTS, SPOONACULAR_DAILY_POINTS / 86400)
+_pacing = PriorityLimiter(SPOONACULAR_RPS, SPOONACULAR_BURST, SPOONACULAR_MAX_WAIT)
+# keyed by (path, params); a flight turns interactive as soon as an
+# interactive caller joins it
+_inflight = SingleFlight()
+_stats = {"calls": 0, "throttled_points": 0, "throttled_rate": 0}
+
+
+def _reserve() -> float:
+    return SPOONACULAR_DAILY_POINTS * SPOONACULAR_BACKGROUND_RESERVE
+
+
+def budget_low() -> bool:
+    """True once only the interactive reserve is left"""
+    return not _points.unlimited and _points.tokens < _reserve()
+
+
+def _room(cost: float, background: bool) -> float:
+    """How many calls of ``cost`` could start now without waiting or throttling"""
+    points = (_points.tokens - (_reserve() if background else 0)) / cost
+    return min(points, _pacing.bucket.tokens)
+
+
+def _record_quota(res, estimate: float):
+    used = res.headers.get("X-API-Quota-Request")
+    if used is not None:
+        metrics.EXTERNAL_UNITS.inc(float(used), api="spoonacular")
+        _points.give(estimate - float(used))
+    left = res.headers.get("X-API-Quota-Left")
+    if left is not None:
+        metrics.EXTERNAL_QUOTA_LEFT.set(float(left), api="spoonacular")
+        _points.cap(float(left))
+
+
+async def _call(stage: str, path: str, params: dict, timeout: float, cost: float, flight: Flight):
+    if not _points.take(cost, keep=_reserve() if flight.background else 0):
+        _stats["throttled_points"] += 1
+        raise Throttled("Spoonacular points budget used up")
+    try:
+        await _pacing.acquire(lambda: flight.background)
+    except RateLimited as e:
+        _points.give(cost)
+        _stats["throttled_rate"] += 1
+        raise Throttled(str(e))
+    except BaseException:
+        _points.give(cost)
+        raise
+
+    _stats["calls"] += 1
+    with metrics.external_call(stage) as call:
+        res = await http_client.get(
+            f"{BASE_URL}{path}", params={**params, "apiKey": API_KEY}, timeout=timeout
+        )
+        call["outcome"] = metrics.http_outcome(res)
+    _record_quota(res, cost)
+
+    if res.status_code == 402:
+        # daily quota used up on Spoonacular's side
+        _points.cap(0)
+        _stats["throttled_points"] += 1
+        raise Throttled("Spoonacular daily quota used up")
+    res.raise_for_status()
+    return res.json()
+
+
+async def _get(stage: str, path: str, params: dict, timeout: float, cost: float,
+               background: bool = False):
+    """GET ``path`` on Spoonacular and return the JSON body.
+
+    Identical concurrent calls share one request, which runs at the highest
+    priority among its callers. The shared request is cancelled only when
+    every caller waiting on it has gone. Raises Throttled instead of calling
+    when the points budget or the pacing has no room.
+    """
+    key = (path, tuple(sorted(params.items())))
+    return await _inflight.run(
+        key, lambda flight: _call(stage, path, params, timeout, cost, flight), background
+    )
+
+
+def limiter_stats() -> dict:
+    return {
+        **_stats,
+        "coalesced": _inflight.coalesced,
+        "points_left": None if _points.unlimited else round(_points.tokens, 2),
+        "daily_points": SPOONACULAR_DAILY_POINTS,
+        "pacing": _pacing.stats(),
+        "inflight": len(_inflight),
+    }
+
+
+# ==============================================
+# ⚡ Async recipe lookup (used by /predict and /recipe)
+# ==============================================
+# complexSearch costs 1 point + 0.01 per result, /information 1 point
+def _search_cost(number: int) -> float:
+    return 1 + 0.01 * number
+
+
+def build_search_queries(food_name: str) -> list[str]:
+    """Candidate complexSearch queries for a label, without duplicates"""
+    candidates = [
+        food_name,
+        food_name.replace("_", " "),
+        f"{food_name} recipe",
+        f"how to make {food_name}",
+    ]
+    # dict keeps insertion order, so the preferred query stays first
+    return list(dict.fromkeys(candidates))
+
+
+async def search_recipe_id(query: str, background: bool = False):
+    """Return the first complexSearch hit for one query, or None"""
+    params = {"query": query, "number": 1}
+    data = await _get("spoonacular_search", "/recipes/complexSearch", params,
+                      timeout=15, cost=_search_cost(1), background=background)
+
+    if data.get("results"):
+        return data["results"][0]["id"]
+    return None
+
+
+async def find_recipe_id(food_name: str, background: bool = False):
+    """Run every candidate query at once; the first hit wins, the rest are cancelled.
+
+    Returns None only when every query answered without a hit. If nothing hit
+    and some query failed, its error is raised so callers don't mistake an
+    outage for "no recipe". Only as many queries start as the points and
+    pacing can cover right now (at least the preferred one), and just that
+    one once the budget is low.
+    """
+    queries = build_search_queries(food_name)
+    if budget_low():
+        queries = queries[:1]
+    queries = queries[:max(1, int(min(len(queries), _room(_search_cost(1), background))))]
+    tasks = [
+        asyncio.create_task(search_recipe_id(q, background))
+        for q in queries
+    ]
+    pending = set(tasks)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    print(f"❌ Spoonacular search error ({food_name}):", error)
+                    continue
+                if task.result():
+                    return task.result()
+        if error is not None:
+            raise error
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def search_food_image(food_name: str, background: bool = False):
+    """Image URL of the top complexSearch hit, or None; raises on API errors"""
+    params = {"query": food_name, "number": 1}
+    data = await _get("spoonacular_search", "/recipes/complexSearch", params,
+                      timeout=10, cost=_search_cost(1), background=background)
+
+    if data.get("results"):
+        return data["results"][0].get("image")
+    return None
+
+
+async def get_recipe_information(recipe_id: int, background: bool = False) -> dict:
+    """Fetch the full recipe (title, instructions, ingredients)"""
+    return await _get("spoonacular_info", f"/recipes/{recipe_id}/information", {},
+                      timeout=20, cost=1, background=background)
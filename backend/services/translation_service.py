@@ -0,0 +1,253 @@
+import hashlib
+import os
+from collections import Counter
+
+from sqlalchemy import bindparam, insert, update
+from starlette.concurrency import run_in_threadpool
+
+import database
+import http_client
+import metrics
+import models
+from cache import LRUCache
+
+DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
+DEEPL_URL = os.getenv("DEEPL_URL", "https://api-free.deepl.com/v2/translate")
+
+# DeepL accepts at most 50 texts and 128 KiB per request
+DEEPL_MAX_TEXTS = 50
+DEEPL_MAX_CHARS = 100_000
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+TRANSLATION_WARMUP_ROWS = int(os.getenv("TRANSLATION_WARMUP_ROWS", "2000"))
+
+
+# ==============================================
+# 🧊 Translation cache (in-process LRU → translation_cache table)
+# ==============================================
+_cache = LRUCache(TRANSLATION_CACHE_SIZE)
+db_hits = 0
+db_misses = 0
+
+# L1 hits not yet added to translation_cache.hits; flushed whenever we touch
+# the table anyway, and on shutdown. Only mutated on the event loop.
+_pending_hits = Counter()
+
+
+def _source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _take_pending_hits() -> Counter:
+    global _pending_hits
+    pending, _pending_hits = _pending_hits, Counter()
+    return pending
+
+
+def _flush_hits(db, pending: Counter):
+    if not pending:
+        return
+    counts = [
+        {"b_hash": h, "b_lang": lang, "b_hits": n}
+        for (h, lang), n in pending.items()
+    ]
+    table = models.TranslationCache.__table__
+    stmt = (
+        update(table)
+        .where(table.c.source_hash == bindparam("b_hash"))
+        .where(table.c.target_lang == bindparam("b_lang"))
+        .values(hits=table.c.hits + bindparam("b_hits"))
+    )
+    db.connection().execute(stmt, counts)
+
+
+def _load_from_db(texts: list[str], target_lang: str, pending: Counter) -> dict:
+    global db_hits, db_misses
+    by_hash = {_source_hash(t): t for t in texts}
+    db = database.SessionLocal()
+    try:
+        rows = (
+            db.query(
+                models.TranslationCache.source_hash,
+                models.TranslationCache.translated_text,
+            )
+            .filter(
+                models.TranslationCache.target_lang == target_lang,
+                models.TranslationCache.source_hash.in_(by_hash),
+            )
+            .all()
+        )
+        for h, _ in rows:
+            pending[(h, target_lang)] += 1
+        _flush_hits(db, pending)
+        db.commit()
+    finally:
+        db.close()
+
+    db_hits += len(rows)
+    db_misses += len(texts) - len(rows)
+    return {by_hash[h]: translated for h, translated in rows}
+
+
+def _store_in_db(translations: dict, target_lang: str):
+    rows = [
+        {
+            "source_hash": _source_hash(src),
+            "target_lang": target_lang,
+            "source_text": src,
+            "translated_text": dst,
+            "hits": 0,
+        }
+        for src, dst in translations.items()
+    ]
+    # Another worker may have stored the same text meanwhile — keep theirs
+    stmt = (
+        insert(models.TranslationCache)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    db = database.SessionLocal()
+    try:
+        db.execute(stmt, rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def warm_cache(limit: int = TRANSLATION_WARMUP_ROWS):
+    """Bulk-load the most used translations into the LRU (run at startup)"""
+    db = database.SessionLocal()
+    try:
+        rows = (
+            db.query(
+                models.TranslationCache.source_text,
+                models.TranslationCache.target_lang,
+                models.TranslationCache.translated_text,
+            )
+            .order_by(models.TranslationCache.hits.desc())
+            .limit(min(limit, TRANSLATION_CACHE_SIZE))
+            .all()
+        )
+    finally:
+        db.close()
+
+    # Coldest first, so the hottest entries end up most recently used
+    for src, lang, dst in reversed(rows):
+        _cache.set((src, lang), dst)
+    return len(rows)
+
+
+def flush_hit_counts(pending: Counter):
+    db = database.SessionLocal()
+    try:
+        _flush_hits(db, pending)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def flush():
+    """Write buffered hit counts to the table (run on shutdown)"""
+    await run_in_threadpool(flush_hit_counts, _take_pending_hits())
+
+
+def cache_stats() -> dict:
+    return {**_cache.stats(), "db_hits": db_hits, "db_misses": db_misses}
+
+
+# ==============================================
+# 🌐 DeepL Translation
+# ==============================================
+async def translate_to_japanese(text: str) -> str:
+    if not text:
+        return ""
+    return (await translate_batch([text]))[0]
+
+
+def _chunks(texts: list[str]):
+    """Split texts into requests that stay under DeepL's size limits"""
+    chunk, size = [], 0
+    for text in texts:
+        if chunk and (len(chunk) >= DEEPL_MAX_TEXTS or size + len(text) > DEEPL_MAX_CHARS):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text)
+    if chunk:
+        yield chunk
+
+
+async def _translate_chunk(texts: list[str], target_lang: str):
+    try:
+        params = {
+            "auth_key": DEEPL_API_KEY,
+            "text": texts,
+            "target_lang": target_lang,
+        }
+        with metrics.external_call("deepl") as call:
+            response = await http_client.post(DEEPL_URL, data=params)
+            call["outcome"] = metrics.http_outcome(response)
+        metrics.EXTERNAL_UNITS.inc(sum(len(t) for t in texts), api="deepl")
+        data = response.json()
+        return [t["text"] for t in data["translations"]]
+    except Exception as e:
+        print("❌ Translation error:", e)
+        return None
+
+
+async def translate_batch(texts: list[str], target_lang: str = "JA") -> list[str]:
+    """Translate many strings in as few DeepL calls as possible.
+
+    Returns the translations in the same order as ``texts``. Empty strings stay
+    empty and repeated strings are only looked up once. Known strings come from
+    the cache; failed translations fall back to the source text and are not
+    cached.
+    """
+    translated, _ = await translate_batch_with_failures(texts, target_lang)
+    return translated
+
+
+async def translate_batch_with_failures(texts: list[str], target_lang: str = "JA"):
+    """``translate_batch`` plus the set of source strings that could not be
+    translated (and were returned as-is)."""
+    unique = list(dict.fromkeys(t for t in texts if t))
+    translated = {}
+    missing = []
+    for text in unique:
+        hit = _cache.get((text, target_lang))
+        if hit is None:
+            missing.append(text)
+        else:
+            translated[text] = hit
+            _pending_hits[(_source_hash(text), target_lang)] += 1
+
+    if missing:
+        try:
+            stored = await run_in_threadpool(
+                _load_from_db, missing, target_lang, _take_pending_hits()
+            )
+        except Exception as e:
+            print("❌ Translation cache read error:", e)
+            stored = {}
+        for src, dst in stored.items():
+            _cache.set((src, target_lang), dst)
+        translated.update(stored)
+        missing = [t for t in missing if t not in stored]
+
+    fresh = {}
+    for chunk in _chunks(missing):
+        result = await _translate_chunk(chunk, target_lang)
+        if result and len(result) == len(chunk):
+            fresh.update(zip(chunk, result))
+
+    if fresh:
+        for src, dst in fresh.items():
+            _cache.set((src, target_lang), dst)
+        translated.update(fresh)
+        try:
+            await run_in_threadpool(_store_in_db, fresh, target_lang)
+        except Exception as e:
+            print("❌ Translation cache write error:", e)
+
+    failed = {t for t in unique if t not in translated}
+    return [translated.get(t, t) if t else "" for t in texts], failed
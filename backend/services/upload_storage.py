@@ -0,0 +1,205 @@
+import hashlib
+import os
+import re
+import stat
+import tempfile
+
+from starlette.concurrency import run_in_threadpool
+
+from cache import LRUCache
+from services import image_utils
+
+UPLOAD_DIR = "backend/uploads"
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# suffix -> (max size, WebP quality)
+RENDITIONS = {
+    "feed": ((1080, 1080), 80),
+    "thumb": ((256, 256), 75),
+}
+
+EXTENSIONS = {
+    "jpeg": "jpg",
+    "png": "png",
+    "gif": "gif",
+    "webp": "webp",
+    "heic": "heic",
+    "bmp": "bmp",
+}
+
+FILE_META_CACHE_SIZE = int(os.getenv("FILE_META_CACHE_SIZE", "10000"))
+
+# "<sha256>.<ext>" — anything else is a legacy random (UUID) name
+_CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})\.[a-z]+$")
+# originals and their renditions ("<sha256>_thumb.webp") never change
+_IMMUTABLE = re.compile(r"^([0-9a-f]{64}(?:_[a-z]+)?)\.[a-z]+$")
+
+
+# ==============================================
+# 📦 Content-addressed storage
+# ==============================================
+def ensure_upload_dir():
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+def _open_temp():
+    fd, path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    return os.fdopen(fd, "wb"), path
+
+
+def _commit(temp_path: str, final_path: str) -> bool:
+    """Move the upload into place; False if the same content was already stored"""
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, final_path)
+    return True
+
+
+async def save_upload(file, max_bytes: int = image_utils.MAX_UPLOAD_BYTES) -> str:
+    """Stream an image upload to disk under its sha256; returns the file name.
+
+    Chunks are hashed as they arrive and written off the event loop. Identical
+    photos end up as one file.
+    """
+    out, temp_path = await run_in_threadpool(_open_temp)
+    digest = hashlib.sha256()
+    size = 0
+    kind = None
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if kind is None:
+                kind = image_utils.sniff_image_type(chunk)
+                if kind is None:
+                    raise image_utils.ImageRejected("Unsupported image type")
+            size += len(chunk)
+            if size > max_bytes:
+                raise image_utils.ImageRejected("Image too large")
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+        await run_in_threadpool(out.close)
+
+        if kind is None:
+            raise image_utils.ImageRejected("Empty upload")
+    except BaseException:
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(os.remove, temp_path)
+        raise
+
+    name = f"{digest.hexdigest()}.{EXTENSIONS[kind]}"
+    await run_in_threadpool(_commit, temp_path, os.path.join(UPLOAD_DIR, name))
+    return name
+
+
+# ==============================================
+# 🖼️ Renditions (WebP, generated at upload time)
+# ==============================================
+def rendition_name(name: str, suffix: str):
+    match = _CONTENT_ADDRESSED.match(name)
+    if not match:
+        return None
+    return f"{match.group(1)}_{suffix}.webp"
+
+
+def _make_renditions(name: str):
+    # Largest first, then shrink that in memory for the smaller ones
+    image = None
+    for suffix, (size, quality) in RENDITIONS.items():
+        path = os.path.join(UPLOAD_DIR, rendition_name(name, suffix))
+        if os.path.exists(path):
+            continue
+        if image is None:
+            image = image_utils.load_thumbnail(os.path.join(UPLOAD_DIR, name), size)
+        image.thumbnail(size)
+        fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format="WEBP", quality=quality, method=4)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+async def create_renditions(name: str):
+    try:
+        await image_utils.run_in_pool(_make_renditions, name)
+    except Exception as e:
+        # the original is still served; the feed falls back to it
+        print(f"❌ Rendition error ({name}):", e)
+
+
+# Renditions never change once written, so a positive check is remembered
+_existing_renditions = LRUCache(10_000)
+
+
+def _rendition_exists(rendition: str) -> bool:
+    if rendition in _existing_renditions:
+        return True
+    if os.path.exists(os.path.join(UPLOAD_DIR, rendition)):
+        _existing_renditions.set(rendition, True)
+        return True
+    return False
+
+
+def image_urls(dish_image: str) -> dict:
+    """Feed-size and thumbnail URLs for a stored ``/uploads/<name>`` image.
+
+    Legacy names and images without renditions fall back to the original.
+    """
+    name = dish_image.rsplit("/", 1)[-1] if dish_image else ""
+    urls = {}
+    for suffix in RENDITIONS:
+        rendition = rendition_name(name, suffix)
+        if rendition and _rendition_exists(rendition):
+            urls[f"image_{suffix}"] = f"/uploads/{rendition}"
+        else:
+            urls[f"image_{suffix}"] = dish_image
+    return urls
+
+
+# ==============================================
+# 📇 File metadata (served without a stat per hit)
+# ==============================================
+_file_meta = LRUCache(FILE_META_CACHE_SIZE)
+
+
+def _load_metadata(filename: str):
+    path = os.path.join(UPLOAD_DIR, filename)
+    try:
+        stat_result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(stat_result.st_mode):
+        return None
+
+    match = _IMMUTABLE.match(filename)
+    if match:
+        etag = f'"{match.group(1)}"'
+    else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    return {
+        "path": path,
+        "stat": stat_result,
+        "etag": etag,
+        "immutable": bool(match),
+    }
+
+
+async def file_metadata(filename: str):
+    """Path, stat result, strong ETag and immutability of an upload, or None.
+
+    Uploads are written once and never modified, so found entries are cached.
+    """
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        return None
+    meta = _file_meta.get(filename)
+    if meta is None:
+        meta = await run_in_threadpool(_load_metadata, filename)
+        if meta is not None:
+            _file_meta.set(filename, meta)
+    return meta
@@ -0,0 +1,248 @@
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+import database
+import models
+from services import feed_service
+
+# Off by default: every like/comment commits on its own
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "5"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500"))
+# Attempts per batch while the database is unreachable (then it is dropped)
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "20"))
+
+
+# ==============================================
+# 📝 Write-behind queue for likes and comments
+# ==============================================
+# Accepted but not yet written. A flush moves them to _inflight while its
+# transaction runs (duplicate likes are still caught there).
+_likes: dict = {}         # (post_id, user_id) -> None, insertion ordered
+_comments: list = []      # {"post_id", "user_id", "comment", "created_at"}
+_inflight_likes: dict = {}
+_inflight_comments: list = []
+
+_flusher: asyncio.Task | None = None
+_wake: asyncio.Event | None = None
+_flush_lock: asyncio.Lock | None = None
+_retries = 0
+# Set by drain(): the flusher finishes its current batch and exits
+_stopping = False
+
+_stats = {"batches": 0, "batches_started": 0, "likes": 0, "comments": 0, "errors": 0, "dropped": 0}
+
+
+def pending_count() -> int:
+    return len(_likes) + len(_comments)
+
+
+def _schedule():
+    global _flusher, _wake
+    if _wake is None:
+        _wake = asyncio.Event()
+    if pending_count() >= WRITE_BEHIND_MAX_BATCH:
+        _wake.set()
+    if not _stopping and (_flusher is None or _flusher.done()):
+        _flusher = asyncio.create_task(_run())
+
+
+async def _run():
+    while pending_count() and not _stopping:
+        try:
+            await asyncio.wait_for(_wake.wait(), WRITE_BEHIND_INTERVAL_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        if not await flush():
+            # database trouble: back off instead of spinning
+            await asyncio.sleep(min(0.05 * _retries, 1.0))
+
+
+def is_queued_like(post_id: int, user_id: int) -> bool:
+    key = (post_id, user_id)
+    return key in _likes or key in _inflight_likes
+
+
+def enqueue_like(post_id: int, user_id: int) -> bool:
+    """Queue a like; False if the same like is already waiting to be written.
+
+    Doesn't look at the database: callers check feed_service.has_like first,
+    so an existing like is still answered as "Already liked".
+    """
+    if is_queued_like(post_id, user_id):
+        return False
+    key = (post_id, user_id)
+    _likes[key] = None
+    _schedule()
+    return True
+
+
+def enqueue_comment(post_id: int, user_id: int, comment: str) -> dict:
+    row = {
+        "post_id": post_id,
+        "user_id": user_id,
+        "comment": comment,
+        "created_at": datetime.utcnow(),
+    }
+    _comments.append(row)
+    _schedule()
+    return row
+
+
+# ==============================================
+# 💾 Flushing (one transaction per batch)
+# ==============================================
+def _write(db, likes: list, comments: list):
+    like_deltas = feed_service.add_likes(db, likes)
+    comment_deltas = feed_service.add_comments(
+        db, [{k: row[k] for k in ("post_id", "user_id", "comment")} for row in comments]
+    )
+    feed_service.bump_counters(db, models.CommunityPost.likes_count, like_deltas)
+    feed_service.bump_counters(db, models.CommunityPost.comments_count, comment_deltas)
+    db.commit()
+
+
+def _write_batch(db, likes: list, comments: list) -> int:
+    """Write a batch; if one row breaks it (e.g. the post was deleted), fall
+    back to row by row so the rest still lands. Returns rows dropped."""
+    try:
+        _write(db, likes, comments)
+        return 0
+    except IntegrityError:
+        db.rollback()
+
+    dropped = 0
+    for like in likes:
+        try:
+            _write(db, [like], [])
+        except IntegrityError as e:
+            db.rollback()
+            dropped += 1
+            print(f"❌ Dropped like {like}:", e.orig)
+    for row in comments:
+        try:
+            _write(db, [], [row])
+        except IntegrityError as e:
+            db.rollback()
+            dropped += 1
+            print(f"❌ Dropped comment on post {row['post_id']}:", e.orig)
+    return dropped
+
+
+async def flush() -> bool:
+    """Write everything queued so far; False if the batch has to be retried"""
+    global _flush_lock, _likes, _comments, _inflight_likes, _inflight_comments, _retries
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+
+    async with _flush_lock:
+        if not pending_count():
+            return True
+        _inflight_likes, _likes = _likes, {}
+        _inflight_comments, _comments = _comments, []
+        likes, comments = list(_inflight_likes), _inflight_comments
+        _stats["batches_started"] += 1
+        try:
+            dropped = await run_in_threadpool(database.run_with_session, _write_batch, likes, comments)
+        except Exception as e:
+            _stats["errors"] += 1
+            _retries += 1
+            if _retries < WRITE_BEHIND_MAX_RETRIES:
+                print("❌ Write-behind flush error (will retry):", e)
+                # put the batch back in front of anything queued meanwhile
+                _likes = {**_inflight_likes, **_likes}
+                _comments = _inflight_comments + _comments
+                return False
+            print(f"❌ Write-behind flush error, dropping {len(likes) + len(comments)} rows:", e)
+            dropped = len(likes) + len(comments)
+        finally:
+            _inflight_likes, _inflight_comments = {}, []
+
+        _retries = 0
+        _stats["batches"] += 1
+        _stats["likes"] += len(likes)
+        _stats["comments"] += len(comments)
+        _stats["dropped"] += dropped
+        return True
+
+
+async def drain():
+    """Flush until the queue is empty (shutdown).
+
+    The flusher isn't cancelled: a batch it is writing would keep running in
+    the threadpool unsupervised. It is told to stop and awaited instead.
+    """
+    global _flusher, _stopping
+    _stopping = True
+    if _wake is not None:
+        _wake.set()
+    if _flusher is not None:
+        try:
+            await _flusher
+        except Exception as e:
+            print("❌ Write-behind flusher error:", e)
+        _flusher = None
+    while pending_count():
+        if not await flush():
+            await asyncio.sleep(0.1)
+
+
+def stats() -> dict:
+    return {**_stats, "enabled": WRITE_BEHIND, "pending": pending_count()}
+
+
+# ==============================================
+# 👀 Read-your-writes overlay
+# ==============================================
+# Queued rows are added to what the database returned. A read only uses its
+# snapshot of the queue if no batch was being written while it ran, so each
+# queued row is counted exactly once: either by the database or the overlay.
+READ_ATTEMPTS = 3
+
+
+async def read(fn, *args):
+    """``await fn(*args)`` plus the queued rows that result cannot include.
+
+    Returns ``(result, queued)``; ``queued`` is None when write-behind is off.
+    """
+    if not WRITE_BEHIND:
+        return await fn(*args), None
+
+    for _ in range(READ_ATTEMPTS):
+        if _flush_lock is not None and _flush_lock.locked():
+            async with _flush_lock:
+                pass
+        started = _stats["batches_started"]
+        queued = ([*_likes], [*_comments])
+        result = await fn(*args)
+        if _stats["batches_started"] == started:
+            return result, queued
+    # still racing flushes: only what is queued now is surely not in the result
+    return result, ([*_likes], [*_comments])
+
+
+def overlay_feed(page: dict, queued) -> dict:
+    if not queued:
+        return page
+    likes = Counter(post_id for post_id, _ in queued[0])
+    comments = Counter(row["post_id"] for row in queued[1])
+    for item in page["items"]:
+        item["likes"] += likes[item["id"]]
+        item["comments"] += comments[item["id"]]
+    return page
+
+
+def overlay_comments(page: dict, post_id: int, queued) -> dict:
+    """Queued comments are the newest, so they go at the end of the last page"""
+    if not queued or page["next_cursor"] is not None:
+        return page
+    page["items"].extend(
+        {"id": None, **row} for row in queued[1] if row["post_id"] == post_id
+    )
+    return page
@@ -0,0 +1,65 @@
+import asyncio
+
+
+# ==============================================
+# 🛫 Coalescing identical concurrent calls
+# ==============================================
+class Flight:
+    """One shared call: its task, how many callers await it, and whether
+    every one of them is a background caller"""
+
+    def __init__(self, background: bool):
+        self.task: asyncio.Task | None = None
+        self.waiters = 0
+        self.background = background
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one task.
+
+    The task runs on its own, so a caller that goes away doesn't cancel it for
+    the others. It is cancelled once nobody waits on it, unless
+    ``cancel_orphans`` is off (e.g. when its result is cached anyway).
+    """
+
+    def __init__(self, cancel_orphans: bool = True):
+        self.cancel_orphans = cancel_orphans
+        self.coalesced = 0
+        self._flights: dict = {}
+
+    def __len__(self):
+        return len(self._flights)
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    def _landed(self, key, flight: Flight, task: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not task.cancelled():
+            # don't warn about an exception nobody else awaited
+            task.exception()
+
+    async def run(self, key, start, background: bool = False):
+        """Await ``start(flight)``, started once per key among concurrent callers.
+
+        ``flight.background`` turns False as soon as a caller with
+        ``background=False`` joins, so the call can be promoted while it waits.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = Flight(background)
+            flight.task = asyncio.create_task(start(flight))
+            flight.task.add_done_callback(lambda t: self._landed(key, flight, t))
+        else:
+            self.coalesced += 1
+            if not background:
+                flight.background = False
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if self.cancel_orphans and flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
@@ -1,7 +1,7 @@
-from backend.database import engine
+from backend.database import get_engine
 
 try:
-    conn = engine.connect()
+    conn = get_engine().connect()
     print("✅ Connected to MySQL successfully!")
     conn.close()
 except Exception as e:
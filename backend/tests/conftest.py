@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The backend uses flat imports (``import models``), like uvicorn --app-dir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test")
@@ -0,0 +1,51 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+np = pytest.importorskip("numpy")
+
+from services import classifier  # noqa: E402
+
+LABELS = ["ramen", "sushi", "pizza", "tacos"]
+
+
+def _jpeg(red: int) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (32, 32), (red, 0, 0)).save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+class StubModel:
+    """Picks the label whose red level (i * 60) is closest to the image's"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        red = np.arange(len(LABELS)) * 60 / 255
+        self.centers = (red - classifier.IMAGENET_MEAN[0]) / classifier.IMAGENET_STD[0]
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        red = batch[:, 0].mean(axis=(1, 2))
+        return -((red[:, None] - self.centers[None, :]) ** 2) * 100
+
+
+def test_concurrent_calls_run_as_one_batch_in_order():
+    model = StubModel()
+    local = classifier.LocalClassifier(
+        model=model, labels=LABELS, input_size=8, max_batch_size=16, max_wait_ms=50
+    )
+    order = [2, 0, 3, 1, 1, 2, 0, 3]
+
+    async def run():
+        try:
+            return await asyncio.gather(*(local.classify(_jpeg(i * 60)) for i in order))
+        finally:
+            await local.close()
+
+    results = asyncio.run(run())
+
+    assert model.batch_sizes == [len(order)]
+    assert [r[0]["label"] for r in results] == [LABELS[i] for i in order]
+    assert local.batcher.stats()["batches"] == 1
@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from bench.seed import seed
+from services import feed_service
+
+
+def _feed_queries(database_url: str, pages: int = 2) -> list[int]:
+    """Statements issued by each of the first ``pages`` feed pages"""
+    engine = create_engine(database_url)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    counts = []
+    try:
+        with Session(engine) as db:
+            cursor = None
+            for _ in range(pages):
+                statements.clear()
+                page = feed_service.build_feed(db, limit=20, cursor=cursor)
+                counts.append(len(statements))
+                assert len(page["items"]) == 20
+                cursor = page["next_cursor"]
+    finally:
+        engine.dispose()
+    return counts
+
+
+def test_feed_query_count_is_constant(tmp_path):
+    small = f"sqlite:///{tmp_path / 'small.db'}"
+    large = f"sqlite:///{tmp_path / 'large.db'}"
+    seed(small, users=20, posts=50, likes_per_post=2, comments_per_post=1)
+    seed(large, users=200, posts=2000, likes_per_post=10, comments_per_post=5)
+
+    # one SELECT per page, however many posts, likes and comments there are
+    assert _feed_queries(small) == _feed_queries(large) == [1, 1]
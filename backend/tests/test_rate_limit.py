@@ -0,0 +1,126 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import PriorityLimiter, RateLimited, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock for TokenBucket refills"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+# ==============================================
+# 🪣 TokenBucket
+# ==============================================
+def test_take_keeps_a_reserve(clock):
+    bucket = TokenBucket(10, rate=1)
+    assert bucket.take(3)
+    assert not bucket.take(5, keep=3)   # would leave 2
+    assert bucket.take(4, keep=3)
+    assert bucket.tokens == 3
+    assert bucket.wait_time(1, keep=3) == 1.0
+    clock[0] += 1
+    assert bucket.take(1, keep=3)
+
+
+def test_refill_stops_at_capacity(clock):
+    bucket = TokenBucket(4, rate=2)
+    assert bucket.take(4)
+    assert bucket.wait_time(3) == 1.5
+    clock[0] += 100
+    assert bucket.tokens == 4
+    assert bucket.wait_time(5) == float("inf")
+
+
+def test_give_and_cap(clock):
+    bucket = TokenBucket(10, rate=0)
+    bucket.take(6)
+    bucket.give(2)          # estimate was too high
+    assert bucket.tokens == 6
+    bucket.give(-1.5)       # ... or too low
+    assert bucket.tokens == 4.5
+    bucket.give(100)
+    assert bucket.tokens == 10
+    bucket.cap(3)           # the server says only 3 are left
+    assert bucket.tokens == 3
+    bucket.cap(8)           # cap never raises the level
+    assert bucket.tokens == 3
+    assert bucket.wait_time(4) == float("inf")
+
+
+def test_zero_capacity_is_unlimited():
+    bucket = TokenBucket(0, rate=0)
+    assert all(bucket.take(1000) for _ in range(10))
+    bucket.cap(0)
+    assert bucket.tokens == float("inf")
+    assert bucket.wait_time(1000) == 0.0
+
+
+# ==============================================
+# 🚦 PriorityLimiter
+# ==============================================
+def test_interactive_callers_go_first():
+    async def scenario():
+        limiter = PriorityLimiter(rate=20, burst=1, max_wait=1)
+        await limiter.acquire()
+        order = []
+
+        async def caller(name, background):
+            await limiter.acquire(background)
+            order.append(name)
+
+        background = asyncio.create_task(caller("background", True))
+        await asyncio.sleep(0)
+        interactive = [asyncio.create_task(caller(f"interactive{i}", False)) for i in range(2)]
+        await asyncio.gather(background, *interactive)
+        return order
+
+    # the background caller was first in line but goes last
+    assert asyncio.run(scenario())[-1] == "background"
+
+
+def test_interactive_callers_give_up_after_max_wait():
+    async def scenario():
+        limiter = PriorityLimiter(rate=1, burst=1, max_wait=0.1)
+        await limiter.acquire()
+        start = time.monotonic()
+        with pytest.raises(RateLimited):
+            await limiter.acquire()
+        assert time.monotonic() - start < 0.1
+        assert limiter.stats()["interactive_waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_promoted_background_caller_gets_max_wait():
+    async def scenario():
+        limiter = PriorityLimiter(rate=0.5, burst=1, max_wait=0.1)
+        await limiter.acquire()
+        background = [True]
+        task = asyncio.create_task(limiter.acquire(lambda: background[0]))
+        await asyncio.sleep(0.2)
+        assert not task.done()      # background callers wait as long as it takes
+        background[0] = False
+        start = time.monotonic()
+        with pytest.raises(RateLimited):
+            await task
+        assert time.monotonic() - start < 0.5
+
+    asyncio.run(scenario())
+
+
+def test_no_rate_means_no_pacing():
+    async def scenario():
+        limiter = PriorityLimiter(rate=0, burst=0, max_wait=0)
+        for _ in range(100):
+            await limiter.acquire()
+        assert limiter.stats()["tokens"] is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import http_client
+from rate_limit import PriorityLimiter, TokenBucket
+from services import spoonacular_service
+from singleflight import SingleFlight
+
+
+class StubResponse:
+    status_code = 200
+    headers: dict = {}
+
+    def __init__(self, body: dict):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+
+class StubSpoonacular:
+    """Stands in for http_client.get; complexSearch answers once ``release`` is set"""
+
+    def __init__(self):
+        self.queries = []
+        self.cancelled = []
+        self.release = asyncio.Event()
+
+    async def get(self, url, params=None, timeout=None):
+        self.queries.append(params["query"])
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(params["query"])
+            raise
+        return StubResponse({"results": [{"id": 42}] if params["query"] == "pizza" else []})
+
+
+@pytest.fixture(autouse=True)
+def spoonacular(monkeypatch):
+    """No budget or pacing unless a test sets them, and fresh coalescing state"""
+    monkeypatch.setattr(spoonacular_service, "_points", TokenBucket(0, 0))
+    monkeypatch.setattr(spoonacular_service, "_pacing", PriorityLimiter(0, 0, 0))
+    monkeypatch.setattr(spoonacular_service, "_inflight", SingleFlight())
+    monkeypatch.setattr(spoonacular_service, "_stats", dict.fromkeys(spoonacular_service._stats, 0))
+
+    def install():
+        stub = StubSpoonacular()
+        monkeypatch.setattr(http_client, "get", stub.get)
+        return stub
+    return install
+
+
+def _search(query: str, background: bool = False):
+    return asyncio.create_task(spoonacular_service.search_recipe_id(query, background))
+
+
+# ==============================================
+# 🛫 Single-flight
+# ==============================================
+def test_identical_lookups_share_one_call(spoonacular):
+    async def scenario():
+        stub = spoonacular()
+        callers = [_search("pizza") for _ in range(10)]
+        await asyncio.sleep(0.01)
+        stub.release.set()
+        assert await asyncio.gather(*callers) == [42] * 10
+        assert stub.queries == ["pizza"]
+
+    asyncio.run(scenario())
+    stats = spoonacular_service.limiter_stats()
+    assert (stats["calls"], stats["coalesced"], stats["inflight"]) == (1, 9, 0)
+
+
+def test_call_is_cancelled_only_with_its_last_caller(spoonacular):
+    async def scenario():
+        stub = spoonacular()
+        first, second = _search("pizza"), _search("pizza")
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert stub.cancelled == []
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert stub.cancelled == ["pizza"]
+        assert spoonacular_service.limiter_stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_interactive_caller_promotes_a_background_call(spoonacular, monkeypatch):
+    # one slot every 2s: background callers wait for it, interactive ones don't
+    monkeypatch.setattr(spoonacular_service, "_pacing", PriorityLimiter(0.5, 1, 0.1))
+
+    async def scenario():
+        stub = spoonacular()
+        stub.release.set()
+        assert await _search("curry") is None
+        background = _search("pizza", background=True)
+        await asyncio.sleep(0.2)
+        assert not background.done()
+        interactive = _search("pizza")
+        for caller in (background, interactive):
+            with pytest.raises(spoonacular_service.Throttled):
+                await caller
+        assert stub.queries == ["curry"]
+
+    asyncio.run(scenario())
+    assert spoonacular_service.limiter_stats()["throttled_rate"] == 1
+
+
+# ==============================================
+# 🔎 Search fan-out
+# ==============================================
+def test_fan_out_covers_only_the_available_slots(spoonacular, monkeypatch):
+    monkeypatch.setattr(spoonacular_service, "_pacing", PriorityLimiter(0.001, 2, 0.1))
+
+    async def scenario():
+        stub = spoonacular()
+        stub.release.set()
+        assert await spoonacular_service.find_recipe_id("fried_rice") is None
+        return stub.queries
+
+    assert asyncio.run(scenario()) == ["fried_rice", "fried rice"]
+
+
+def test_fan_out_without_limits_tries_every_query(spoonacular):
+    async def scenario():
+        stub = spoonacular()
+        stub.release.set()
+        assert await spoonacular_service.find_recipe_id("fried_rice") is None
+        return stub.queries
+
+    assert sorted(asyncio.run(scenario())) == sorted(
+        spoonacular_service.build_search_queries("fried_rice")
+    )
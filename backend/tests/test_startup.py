@@ -0,0 +1,20 @@
+import os
+
+import manage
+
+
+def test_import_and_startup_within_budget(tmp_path):
+    # nothing listens on port 9: warmup of the external APIs fails fast
+    unreachable = "http://127.0.0.1:9"
+    measured = manage.measure_startup({
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}",
+        "SPOONACULAR_BASE_URL": unreachable,
+        "DEEPL_URL": f"{unreachable}/v2/translate",
+        "HUGGINGFACE_BASE_URL": unreachable,
+        "GOOGLE_CLIENT_IDS": "",
+        "JWT_SECRET": "test",
+    })
+
+    assert measured["import_ms"] <= manage.IMPORT_BUDGET_MS
+    assert measured["startup"]["total"] <= manage.STARTUP_BUDGET_MS
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+
+import database
+import models
+from bench.seed import seed
+from services import feed_service, write_buffer
+
+POSTS = 5
+
+
+@pytest.fixture(autouse=True)
+def buffer_db(tmp_path, monkeypatch):
+    """Seeded SQLite database, write-behind on, and a fresh queue per test"""
+    url = f"sqlite:///{tmp_path / 'feed.db'}"
+    seed(url, users=10, posts=POSTS, likes_per_post=0, comments_per_post=0)
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", url)
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(write_buffer, "WRITE_BEHIND", True)
+    # the background flusher only runs when a test asks for it
+    monkeypatch.setattr(write_buffer, "WRITE_BEHIND_INTERVAL_MS", 60_000)
+    for name, value in {
+        "_likes": {}, "_comments": [], "_inflight_likes": {}, "_inflight_comments": [],
+        "_flusher": None, "_wake": None, "_flush_lock": None, "_retries": 0, "_stopping": False,
+        "_stats": dict.fromkeys(write_buffer._stats, 0),
+    }.items():
+        monkeypatch.setattr(write_buffer, name, value)
+    yield
+    database.get_engine().dispose()
+
+
+def _run_sync(fn, *args):
+    return run_in_threadpool(database.run_with_session, fn, *args)
+
+
+def _stored() -> dict:
+    """Rows and denormalized counters actually in the database"""
+    def count(db):
+        return {
+            "likes": db.query(func.count(models.PostLike.id)).scalar(),
+            "comments": db.query(func.count(models.PostComment.id)).scalar(),
+            "likes_count": db.query(func.sum(models.CommunityPost.likes_count)).scalar(),
+            "comments_count": db.query(func.sum(models.CommunityPost.comments_count)).scalar(),
+        }
+    return database.run_with_session(count)
+
+
+async def _feed_totals(fn=_run_sync) -> tuple[int, int]:
+    page, queued = await write_buffer.read(fn, feed_service.build_feed, POSTS)
+    page = write_buffer.overlay_feed(page, queued)
+    return sum(item["likes"] for item in page["items"]), sum(item["comments"] for item in page["items"])
+
+
+def _queue(likes: int, comments: int):
+    for i in range(likes):
+        assert write_buffer.enqueue_like(i % POSTS + 1, i // POSTS + 1)
+    for i in range(comments):
+        write_buffer.enqueue_comment(i % POSTS + 1, 1, f"comment {i}")
+
+
+# ==============================================
+# 👀 Each queued row is counted exactly once
+# ==============================================
+def test_queued_rows_counted_once_before_and_after_flush():
+    async def scenario():
+        _queue(likes=7, comments=3)
+        assert not write_buffer.enqueue_like(1, 1)  # already queued
+        assert await _feed_totals() == (7, 3)
+        assert await write_buffer.flush()
+        assert write_buffer.pending_count() == 0
+        assert await _feed_totals() == (7, 3)
+
+    asyncio.run(scenario())
+    assert _stored() == {"likes": 7, "comments": 3, "likes_count": 7, "comments_count": 3}
+
+
+def test_read_waits_for_a_batch_being_written(monkeypatch):
+    writing, release = threading.Event(), threading.Event()
+    write_batch = write_buffer._write_batch
+
+    def slow_write_batch(db, likes, comments):
+        writing.set()
+        release.wait(5)
+        return write_batch(db, likes, comments)
+
+    monkeypatch.setattr(write_buffer, "_write_batch", slow_write_batch)
+
+    async def scenario():
+        _queue(likes=4, comments=2)
+        flushing = asyncio.create_task(write_buffer.flush())
+        while not writing.is_set():
+            await asyncio.sleep(0.001)
+        # queued again while the first batch is in flight
+        _queue(likes=0, comments=1)
+        reading = asyncio.create_task(_feed_totals())
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await flushing
+        assert await reading == (4, 3)
+
+    asyncio.run(scenario())
+
+
+def test_read_retries_when_a_flush_lands_during_it():
+    flushed = []
+
+    async def flush_then_read(fn, *args):
+        if not flushed:
+            # the batch commits after this read took its snapshot of the queue
+            flushed.append(await write_buffer.flush())
+        return await _run_sync(fn, *args)
+
+    async def scenario():
+        _queue(likes=6, comments=2)
+        assert await _feed_totals(flush_then_read) == (6, 2)
+
+    asyncio.run(scenario())
+    assert flushed == [True]
+
+
+# ==============================================
+# 🔁 Database errors
+# ==============================================
+def test_failed_batch_is_requeued_and_retried(monkeypatch):
+    calls = []
+    write_batch = write_buffer._write_batch
+
+    def flaky_write_batch(db, likes, comments):
+        calls.append(len(likes) + len(comments))
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("database is down"))
+        return write_batch(db, likes, comments)
+
+    monkeypatch.setattr(write_buffer, "_write_batch", flaky_write_batch)
+
+    async def scenario():
+        _queue(likes=3, comments=1)
+        assert not await write_buffer.flush()
+        assert write_buffer.pending_count() == 4
+        assert await _feed_totals() == (3, 1)
+
+        write_buffer.enqueue_like(1, 9)
+        # the failed batch goes back in front of what was queued meanwhile
+        assert list(write_buffer._likes) == [(1, 1), (2, 1), (3, 1), (1, 9)]
+        assert await write_buffer.flush()
+
+    asyncio.run(scenario())
+    assert calls == [4, 5]
+    assert write_buffer.stats()["errors"] == 1
+    assert write_buffer.stats()["dropped"] == 0
+    assert _stored() == {"likes": 4, "comments": 1, "likes_count": 4, "comments_count": 1}
+
+
+def test_batch_dropped_after_max_retries(monkeypatch):
+    def broken_write_batch(db, likes, comments):
+        raise OperationalError("INSERT", {}, Exception("database is down"))
+
+    monkeypatch.setattr(write_buffer, "_write_batch", broken_write_batch)
+    monkeypatch.setattr(write_buffer, "WRITE_BEHIND_MAX_RETRIES", 2)
+
+    async def scenario():
+        _queue(likes=2, comments=0)
+        assert not await write_buffer.flush()
+        assert await write_buffer.flush()
+
+    asyncio.run(scenario())
+    assert write_buffer.pending_count() == 0
+    assert write_buffer.stats()["dropped"] == 2
+
+
+# ==============================================
+# 🛑 Shutdown
+# ==============================================
+def test_drain_writes_everything(monkeypatch):
+    monkeypatch.setattr(write_buffer, "WRITE_BEHIND_INTERVAL_MS", 1)
+    monkeypatch.setattr(write_buffer, "WRITE_BEHIND_MAX_BATCH", 8)
+    writing = threading.Event()
+    write_batch = write_buffer._write_batch
+
+    def watched_write_batch(db, likes, comments):
+        writing.set()
+        return write_batch(db, likes, comments)
+
+    monkeypatch.setattr(write_buffer, "_write_batch", watched_write_batch)
+
+    async def scenario():
+        _queue(likes=20, comments=5)
+        while not writing.is_set():
+            await asyncio.sleep(0.001)
+        # still arriving while the flusher is busy
+        for i in range(5):
+            write_buffer.enqueue_like(i + 1, 10)
+        await write_buffer.drain()
+        assert write_buffer.pending_count() == 0
+        assert await _feed_totals() == (25, 5)
+
+    asyncio.run(scenario())
+    assert _stored() == {"likes": 25, "comments": 5, "likes_count": 25, "comments_count": 5}
@@ -17,7 +17,7 @@ export default function Comments({ route }: any) {
 
   const loadComments = async () => {
     const res = await getComments(post.id);
-    setComments(res.data);
+    setComments(res.data.items);
   };
 
   const sendComment = async () => {
@@ -74,7 +74,7 @@ export default function HomeScreen({ navigation }) {
     try {
       const res = await fetch(`${API_URL}/api/community/posts`);
       const data = await res.json();
-      setCommunityPosts(data);
+      setCommunityPosts(data.items);
     } catch (e) {
       console.log("ERROR loading community feed:", e);
     }